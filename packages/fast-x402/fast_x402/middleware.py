@@ -1,6 +1,8 @@
 """FastAPI middleware for x402 payments"""
 
-from typing import Dict, Union, Optional, Callable
+import fnmatch
+import re
+from typing import Dict, List, Pattern, Tuple, Union, Optional, Callable
 from fastapi import Request, Response, HTTPException
 from fastapi.responses import JSONResponse
 from starlette.middleware.base import BaseHTTPMiddleware
@@ -25,6 +27,7 @@ class X402Middleware(BaseHTTPMiddleware):
         super().__init__(app)
         self.provider = provider
         self.routes = self._normalize_routes(routes)
+        self._compile_routes()
         self.on_payment = on_payment
         self.on_error = on_error
     
@@ -42,6 +45,23 @@ class X402Middleware(BaseHTTPMiddleware):
                 normalized[path] = config
         return normalized
     
+    def _compile_routes(self):
+        """Index routes so matching doesn't scan every pattern per request"""
+        self._exact: Dict[str, RouteConfig] = {}
+        self._prefixes: List[Tuple[str, RouteConfig]] = []
+        self._patterns: List[Tuple[Pattern[str], RouteConfig]] = []
+        
+        for route_path, config in self.routes.items():
+            if "*" not in route_path:
+                self._exact[route_path] = config
+            elif route_path.endswith("*") and "*" not in route_path[:-1]:
+                self._prefixes.append((route_path[:-1], config))
+            else:
+                self._patterns.append((re.compile(fnmatch.translate(route_path)), config))
+        
+        # Most specific prefix wins
+        self._prefixes.sort(key=lambda item: len(item[0]), reverse=True)
+    
     async def dispatch(self, request: Request, call_next):
         """Process requests and handle x402 payments"""
         
@@ -122,12 +142,18 @@ class X402Middleware(BaseHTTPMiddleware):
     def _match_route(self, path: str) -> Optional[RouteConfig]:
         """Match request path to route configuration"""
         # Exact match
-        if path in self.routes:
-            return self.routes[path]
+        config = self._exact.get(path)
+        if config is not None:
+            return config
         
         # Prefix match (e.g., /api/* matches /api/users)
-        for route_path, config in self.routes.items():
-            if route_path.endswith("*") and path.startswith(route_path[:-1]):
+        for prefix, config in self._prefixes:
+            if path.startswith(prefix):
+                return config
+        
+        # Other wildcards (e.g., /users/*/profile)
+        for pattern, config in self._patterns:
+            if pattern.match(path):
                 return config
         
         return None
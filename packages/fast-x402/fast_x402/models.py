@@ -1,9 +1,30 @@
 """Data models for fast-x402"""
 
+from decimal import Decimal, InvalidOperation
+from functools import cached_property, lru_cache
 from typing import Dict, List, Optional, Any, Callable
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from datetime import datetime
 
+from .exceptions import InvalidPaymentError
+
+
+def _hex_to_bytes(value: str) -> bytes:
+    """Decode a hex string with or without a 0x prefix"""
+    return bytes.fromhex(value[2:] if value[:2] in ("0x", "0X") else value)
+
+
+@lru_cache(maxsize=1024)
+def to_token_units(amount: str, decimals: int = 6) -> int:
+    """Convert a decimal amount string to integer token units (USDC has 6 decimals)"""
+    try:
+        units = Decimal(amount).scaleb(decimals)
+        if not units.is_finite():
+            raise InvalidPaymentError(f"Invalid payment amount: {amount}")
+        return int(units.to_integral_value())
+    except (InvalidOperation, ArithmeticError, ValueError):
+        raise InvalidPaymentError(f"Invalid payment amount: {amount}")
+
 
 class PaymentRequirement(BaseModel):
     """Payment requirement details for HTTP 402 response"""
@@ -15,8 +36,11 @@ class PaymentRequirement(BaseModel):
     expires_at: int = Field(..., description="Unix timestamp when payment expires")
     scheme: str = Field(default="exact", description="Payment scheme: exact or upto")
     
-    class Config:
-        json_schema_extra = {
+    # Requirements are issued once and only read afterwards; frozen also
+    # keeps amount_units consistent with amount
+    model_config = ConfigDict(
+        frozen=True,
+        json_schema_extra={
             "example": {
                 "amount": "0.10",
                 "token": "0xA0b86991c6218b36c1d19D4a2e9Eb0cE3606eB48",
@@ -26,7 +50,13 @@ class PaymentRequirement(BaseModel):
                 "expires_at": 1704067200,
                 "scheme": "exact"
             }
-        }
+        },
+    )
+    
+    @cached_property
+    def amount_units(self) -> int:
+        """Required amount in integer token units, parsed once"""
+        return to_token_units(self.amount)
 
 
 class PaymentData(BaseModel):
@@ -40,8 +70,54 @@ class PaymentData(BaseModel):
     valid_before: int = Field(..., description="Validity timestamp")
     signature: str = Field(..., description="EIP-712 signature")
     
-    class Config:
-        populate_by_name = True
+    # Left mutable (and without slots): the derived forms below are
+    # cached in the instance __dict__ and cleared on assignment
+    model_config = ConfigDict(populate_by_name=True)
+    
+    # Lower-cased addresses, computed once per payment for comparisons
+    @cached_property
+    def from_lc(self) -> str:
+        return self.from_address.lower()
+    
+    @cached_property
+    def to_lc(self) -> str:
+        return self.to.lower()
+    
+    @cached_property
+    def token_lc(self) -> str:
+        return self.token.lower()
+    
+    # Raw 20-byte addresses; case-insensitive by construction
+    @cached_property
+    def from_bytes(self) -> bytes:
+        return _hex_to_bytes(self.from_address)
+    
+    @cached_property
+    def to_bytes(self) -> bytes:
+        return _hex_to_bytes(self.to)
+    
+    # Parsed forms of the numeric/hex fields, decoded once per payment
+    @cached_property
+    def value_int(self) -> int:
+        return int(self.value)
+    
+    @cached_property
+    def sig_bytes(self) -> bytes:
+        return _hex_to_bytes(self.signature)
+    
+    # Drop the cached forms whenever a field changes so they never go stale
+    def __setattr__(self, name: str, value: Any):
+        super().__setattr__(name, value)
+        self._clear_derived()
+    
+    def model_copy(self, *, update: Optional[Dict[str, Any]] = None, deep: bool = False) -> "PaymentData":
+        copied = super().model_copy(update=update, deep=deep)
+        copied._clear_derived()
+        return copied
+    
+    def _clear_derived(self):
+        for name in ("from_lc", "to_lc", "token_lc", "from_bytes", "to_bytes", "value_int", "sig_bytes"):
+            self.__dict__.pop(name, None)
 
 
 class PaymentVerification(BaseModel):
@@ -70,13 +146,13 @@ class X402Config(BaseModel):
     settlement_address: Optional[str] = None
     cache_enabled: bool = True
     cache_ttl: int = 300  # 5 minutes
+    batch_verify_workers: Optional[int] = None  # processes for batch signature checks; None = CPU count
     analytics_enabled: bool = True
     analytics_webhook: Optional[str] = None
     custom_validation: Optional[Any] = None  # Callable in runtime
     mode: str = Field(default="production", description="Operating mode: production, development, or testing")
     
-    class Config:
-        arbitrary_types_allowed = True
+    model_config = ConfigDict(arbitrary_types_allowed=True)
 
 
 class PayerStats(BaseModel):
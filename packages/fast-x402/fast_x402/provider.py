@@ -1,11 +1,15 @@
 """Core X402Provider implementation"""
 
 import asyncio
+import hashlib
+import heapq
 import secrets
 import time
 from typing import Dict, Optional, List, Callable, Any, Tuple
 from datetime import datetime
-from collections import defaultdict
+from collections import Counter, defaultdict, OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from operator import itemgetter
 import sys
 import os
 
@@ -21,17 +25,43 @@ from .models import (
     PayerStats,
 )
 from .exceptions import X402Error, InvalidPaymentError, InvalidSignatureError
-from .verification import verify_eip712_signature, verify_payment_requirements
+from .verification import (
+    verify_eip712_signature_async,
+    verify_eip712_signatures_batch,
+    verify_payment_requirements,
+    NonceRegistry,
+    _sig_cache_key,
+)
 from .logger import logger
 
 try:
     from .shared.wallet import WalletManager, generate_wallet
     from .shared.analytics import get_analytics, AnalyticsEvent
+    from .shared import jsonutil
 except ImportError:
     # Fallback if shared module not available
     WalletManager = None
     get_analytics = None
     AnalyticsEvent = None
+    jsonutil = None
+
+
+def _verification_cache_key(payment_data: PaymentData, requirement: PaymentRequirement) -> bytes:
+    """Key a verification on every signed field and the requirement it met
+    
+    The requirement's nonce is part of the key: the middleware issues a fresh
+    requirement per 402, so an accepted payment replayed against a new one
+    must miss the cache and reach the nonce registry.
+    """
+    raw = "|".join((
+        requirement.nonce,
+        str(requirement.amount_units),
+        requirement.recipient.lower(),
+        requirement.token.lower(),
+        str(requirement.chain_id),
+        requirement.scheme,
+    ))
+    return _sig_cache_key(payment_data) + hashlib.blake2b(raw.encode(), digest_size=16).digest()
 
 
 class X402Provider:
@@ -56,25 +86,40 @@ class X402Provider:
         # Initialize shared analytics
         self.analytics = get_analytics() if get_analytics else None
         
-        # Local analytics data
+        # Local analytics data, aggregated incrementally in token base units
         self.analytics_data = {
             "requests": 0,
             "paid": 0,
             "revenue": defaultdict(int),
-            "payers": defaultdict(lambda: {"total": 0, "count": 0, "last": None}),
+            "payer_totals": defaultdict(int),
+            "payer_counts": Counter(),
+            "payer_last": {},
             "endpoints": defaultdict(lambda: defaultdict(int)),
         }
-        self.payment_cache: Dict[str, PaymentVerification] = {}
-        self._cache_lock = asyncio.Lock()
+        # LRU of verified payments -> (verification, monotonic_ns deadline);
+        # bounded and pruned on insert, so no background cleanup is needed
+        self.payment_cache: "OrderedDict[bytes, Tuple[PaymentVerification, int]]" = OrderedDict()
+        self._cache_max = 10_000
+        
+        # Replay protection: nonces of payments this provider has accepted
+        self.nonces = NonceRegistry()
+        
+        # Pooled client for webhooks, created on first use
+        self._http: Optional[httpx.AsyncClient] = None
+        
+        # Worker processes for verify_payments_batch, started on first use
+        # and shut down by aclose()
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+        
+        # Webhooks are queued and sent by a single background worker, so a
+        # burst of payments can't pile up unbounded tasks
+        self._webhook_queue: Optional[asyncio.Queue] = None
+        self._webhook_task: Optional[asyncio.Task] = None
+        self.webhooks_dropped = 0
         
         wallet_display = config.wallet_address[:8] + "..." if config.wallet_address else "None"
         logger.info(f"Initializing X402Provider with wallet {wallet_display}")
         logger.debug(f"Chain ID: {config.chain_id}, Accepted tokens: {len(config.accepted_tokens or [])}")
-        
-        # Start cache cleanup task if caching is enabled
-        if self.config.cache_enabled:
-            asyncio.create_task(self._cache_cleanup_task())
-            logger.debug("Cache cleanup task started")
     
     def create_payment_requirement(
         self,
@@ -87,12 +132,16 @@ class X402Provider:
         
         self.analytics_data["requests"] += 1
         
+        # Endpoint labels repeat on every request; interned keys hash and
+        # compare by identity in the analytics dicts
+        endpoint = sys.intern(endpoint) if endpoint else None
+        
         if endpoint and endpoint not in self.analytics_data["endpoints"]:
             self.analytics_data["endpoints"][endpoint] = defaultdict(int)
         
         # Track payment request in shared analytics
         if self.analytics and AnalyticsEvent:
-            asyncio.create_task(self.analytics.track_event(
+            self.analytics.enqueue_event(
                 AnalyticsEvent.PAYMENT_REQUESTED,
                 provider_address=self.config.wallet_address,
                 amount=float(amount),
@@ -101,7 +150,7 @@ class X402Provider:
                     "token": token or self.config.accepted_tokens[0],
                     "scheme": scheme,
                 }
-            ))
+            )
         
         nonce = "0x" + secrets.token_hex(32)
         expires_at = int(time.time()) + 300  # 5 minutes
@@ -125,25 +174,36 @@ class X402Provider:
         """Verify a payment against requirements"""
         
         try:
-            # Check cache first
-            cache_key = f"{payment_data.signature}-{payment_data.nonce}"
-            if self.config.cache_enabled:
-                async with self._cache_lock:
-                    if cache_key in self.payment_cache:
-                        return self.payment_cache[cache_key]
+            # Read the clocks once: wall time for payment expiry, monotonic
+            # time for cache freshness (immune to wall-clock jumps)
+            now = int(time.time())
+            now_ns = time.monotonic_ns()
+            
+            # Check cache first. Entries are only stored after this exact
+            # signed payment passed every check for this exact requirement
+            # (nonce included) and claimed its nonce, so a hit is an
+            # idempotent re-read of that acceptance rather than a second
+            # payment. Expiry is re-checked so a hit never outlives the payment
+            cache_key = _verification_cache_key(payment_data, requirement)
+            if self.config.cache_enabled and payment_data.valid_before >= now:
+                cached = self._get_cached_verification(cache_key, now_ns)
+                if cached is not None:
+                    return cached
             
             # Verify payment requirements
             verify_payment_requirements(
                 payment_data,
-                requirement.amount,
+                requirement.amount_units,
                 requirement.token,
                 requirement.recipient,
                 requirement.chain_id,
                 requirement.scheme,
+                nonces=self.nonces,
+                now=now,
             )
             
             # Verify signature
-            if not verify_eip712_signature(payment_data):
+            if not await verify_eip712_signature_async(payment_data):
                 raise InvalidSignatureError("Invalid payment signature")
             
             # Custom validation if provided
@@ -152,12 +212,17 @@ class X402Provider:
                 if not custom_result:
                     raise InvalidPaymentError("Custom validation failed", "CUSTOM_VALIDATION_FAILED")
             
+            # Claim the nonce only once the payment is fully verified, so
+            # concurrent submissions of the same payment can't both succeed
+            if not self.nonces.claim(payment_data):
+                raise InvalidPaymentError("Nonce already used", "NONCE_REUSED")
+            
             # Update analytics
             await self._update_analytics(payment_data, endpoint)
             
             # Track successful payment in shared analytics
             if self.analytics and AnalyticsEvent:
-                await self.analytics.track_event(
+                self.analytics.enqueue_event(
                     AnalyticsEvent.PAYMENT_COMPLETED,
                     wallet_address=payment_data.from_address,
                     provider_address=self.config.wallet_address,
@@ -177,19 +242,20 @@ class X402Provider:
             
             # Cache the result
             if self.config.cache_enabled:
-                async with self._cache_lock:
-                    self.payment_cache[cache_key] = verification
+                self._cache_verification(
+                    cache_key, verification, payment_data.valid_before - now, now_ns
+                )
             
             # Send webhook if configured
             if self.config.analytics_webhook:
-                asyncio.create_task(self._send_webhook(payment_data, endpoint))
+                self._enqueue_webhook(payment_data, endpoint)
             
             return verification
             
         except X402Error as e:
             # Track failed payment in shared analytics
             if self.analytics and AnalyticsEvent:
-                await self.analytics.track_event(
+                self.analytics.enqueue_event(
                     AnalyticsEvent.PAYMENT_FAILED,
                     wallet_address=payment_data.from_address if payment_data else None,
                     provider_address=self.config.wallet_address,
@@ -199,7 +265,7 @@ class X402Provider:
         except Exception as e:
             # Track failed payment in shared analytics
             if self.analytics and AnalyticsEvent:
-                await self.analytics.track_event(
+                self.analytics.enqueue_event(
                     AnalyticsEvent.PAYMENT_FAILED,
                     wallet_address=payment_data.from_address if payment_data else None,
                     provider_address=self.config.wallet_address,
@@ -207,6 +273,32 @@ class X402Provider:
                 )
             raise InvalidPaymentError(f"Payment verification failed: {str(e)}")
     
+    async def verify_payments_batch(
+        self,
+        payments: List[PaymentData],
+        requirements: List[PaymentRequirement],
+        endpoint: Optional[str] = None,
+    ) -> List[Any]:
+        """Verify several payments, recovering their signers in parallel
+        
+        Returns one entry per payment: its PaymentVerification, or the
+        exception verify_payment raised for it.
+        """
+        if len(payments) != len(requirements):
+            raise ValueError("payments and requirements must have the same length")
+        
+        # Recover all signers across worker processes first; each
+        # verify_payment below then finds its signature already cached
+        await verify_eip712_signatures_batch(payments, self._get_process_pool())
+        
+        return await asyncio.gather(
+            *(
+                self.verify_payment(payment_data, requirement, endpoint)
+                for payment_data, requirement in zip(payments, requirements)
+            ),
+            return_exceptions=True
+        )
+    
     async def _run_custom_validation(self, payment_data: PaymentData) -> bool:
         """Run custom validation if it's async, otherwise run it sync"""
         if asyncio.iscoroutinefunction(self.config.custom_validation):
@@ -219,20 +311,19 @@ class X402Provider:
         self.analytics_data["paid"] += 1
         
         # Update revenue
-        token = payment_data.token.lower()
-        amount = int(payment_data.value)
+        token = sys.intern(payment_data.token_lc)
+        amount = payment_data.value_int
         self.analytics_data["revenue"][token] += amount
         
         # Update payer stats
-        payer = payment_data.from_address.lower()
-        payer_data = self.analytics_data["payers"][payer]
-        payer_data["total"] += amount
-        payer_data["count"] += 1
-        payer_data["last"] = datetime.utcnow()
+        payer = sys.intern(payment_data.from_lc)
+        self.analytics_data["payer_totals"][payer] += amount
+        self.analytics_data["payer_counts"][payer] += 1
+        self.analytics_data["payer_last"][payer] = datetime.utcnow()
         
         # Update endpoint stats
         if endpoint:
-            self.analytics_data["endpoints"][endpoint][token] += amount
+            self.analytics_data["endpoints"][sys.intern(endpoint)][token] += amount
     
     def get_analytics(self) -> X402Analytics:
         """Get current analytics data"""
@@ -242,21 +333,20 @@ class X402Provider:
         total_paid = self.analytics_data["paid"]
         conversion_rate = total_paid / total_requests if total_requests > 0 else 0.0
         
-        # Get top payers
-        top_payers = []
-        for address, data in self.analytics_data["payers"].items():
-            if data["count"] > 0:
-                top_payers.append(
-                    PayerStats(
-                        address=address,
-                        total=str(data["total"]),
-                        count=data["count"],
-                        last_payment=data["last"] or datetime.utcnow(),
-                    )
-                )
-        
-        # Sort by total amount
-        top_payers.sort(key=lambda x: int(x.total), reverse=True)
+        # Top 10 payers by total amount; only those 10 become models
+        payer_counts = self.analytics_data["payer_counts"]
+        payer_last = self.analytics_data["payer_last"]
+        top_payers = [
+            PayerStats(
+                address=address,
+                total=str(total),
+                count=payer_counts[address],
+                last_payment=payer_last[address],
+            )
+            for address, total in heapq.nlargest(
+                10, self.analytics_data["payer_totals"].items(), key=itemgetter(1)
+            )
+        ]
         
         # Convert revenue to strings
         total_revenue = {
@@ -277,39 +367,118 @@ class X402Provider:
             total_paid=total_paid,
             total_revenue=total_revenue,
             conversion_rate=conversion_rate,
-            top_payers=top_payers[:10],  # Top 10 payers
+            top_payers=top_payers,
             revenue_by_endpoint=revenue_by_endpoint,
         )
     
-    async def _cache_cleanup_task(self):
-        """Periodically clean up expired cache entries"""
-        while True:
-            await asyncio.sleep(60)  # Run every minute
-            async with self._cache_lock:
-                # Simple cleanup - remove oldest entries if cache is too large
-                if len(self.payment_cache) > 10000:
-                    # Remove half of the entries (oldest first)
-                    keys_to_remove = list(self.payment_cache.keys())[:5000]
-                    for key in keys_to_remove:
-                        del self.payment_cache[key]
+    def _get_cached_verification(self, cache_key: bytes, now_ns: int) -> Optional[PaymentVerification]:
+        """Return a cached, unexpired verification and mark it recently used"""
+        entry = self.payment_cache.get(cache_key)
+        if entry is None:
+            return None
+        
+        verification, deadline_ns = entry
+        if deadline_ns <= now_ns:
+            del self.payment_cache[cache_key]
+            return None
+        
+        self.payment_cache.move_to_end(cache_key)
+        return verification
     
-    async def _send_webhook(self, payment_data: PaymentData, endpoint: Optional[str] = None):
-        """Send webhook notification"""
+    def _cache_verification(self,
+                            cache_key: bytes,
+                            verification: PaymentVerification,
+                            valid_for: int,
+                            now_ns: int):
+        """Cache a verification until the payment expires, evicting LRU/expired entries
+        
+        Entries hold a monotonic_ns deadline: ``valid_for`` seconds (the time
+        left before the payment expires), capped at the configured cache TTL.
+        """
+        cache = self.payment_cache
+        ttl = min(valid_for, self.config.cache_ttl)
+        cache[cache_key] = (verification, now_ns + ttl * 1_000_000_000)
+        cache.move_to_end(cache_key)
+        
+        while cache:
+            _, deadline_ns = next(iter(cache.values()))
+            if len(cache) > self._cache_max or deadline_ns <= now_ns:
+                cache.popitem(last=False)
+            else:
+                break
+    
+    def _get_http(self) -> httpx.AsyncClient:
+        """Return the shared HTTP client, creating it if needed"""
+        if self._http is None or self._http.is_closed:
+            self._http = httpx.AsyncClient(
+                timeout=5.0,
+                limits=httpx.Limits(max_keepalive_connections=10),
+            )
+        return self._http
+    
+    def _get_process_pool(self) -> ProcessPoolExecutor:
+        """Return the batch verification process pool, creating it if needed"""
+        if self._process_pool is None:
+            self._process_pool = ProcessPoolExecutor(
+                max_workers=self.config.batch_verify_workers
+            )
+        return self._process_pool
+    
+    async def aclose(self):
+        """Stop the webhook worker, close the HTTP client and the process pool"""
+        if self._webhook_task is not None:
+            self._webhook_task.cancel()
+            self._webhook_task = None
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+        if self._process_pool is not None:
+            self._process_pool.shutdown(wait=False, cancel_futures=True)
+            self._process_pool = None
+    
+    def _enqueue_webhook(self, payment_data: PaymentData, endpoint: Optional[str] = None):
+        """Queue a webhook notification without waiting for it to be sent"""
+        if self._webhook_queue is None:
+            self._webhook_queue = asyncio.Queue(maxsize=1024)
+        if self._webhook_task is None or self._webhook_task.done():
+            self._webhook_task = asyncio.create_task(self._webhook_worker())
+        
+        payload = {
+            "type": "payment_received",
+            "payment": payment_data.model_dump(),
+            "endpoint": endpoint,
+            "timestamp": datetime.utcnow().isoformat(),
+        }
         try:
-            async with httpx.AsyncClient() as client:
-                await client.post(
-                    self.config.analytics_webhook,
-                    json={
-                        "type": "payment_received",
-                        "payment": payment_data.model_dump(),
-                        "endpoint": endpoint,
-                        "timestamp": datetime.utcnow().isoformat(),
-                    },
-                    timeout=5.0,
-                )
-        except Exception:
-            # Silently fail - don't block payment processing
-            pass
+            self._webhook_queue.put_nowait(payload)
+        except asyncio.QueueFull:
+            self.webhooks_dropped += 1
+            logger.warning("Webhook queue full, dropping notification")
+    
+    async def _webhook_worker(self):
+        """Send queued webhook notifications one at a time"""
+        while True:
+            payload = await self._webhook_queue.get()
+            try:
+                if jsonutil is not None:
+                    # Serialize ourselves so orjson is used when installed
+                    await self._get_http().post(
+                        self.config.analytics_webhook,
+                        content=jsonutil.dumps(payload),
+                        headers={"Content-Type": "application/json"},
+                        timeout=5.0,
+                    )
+                else:
+                    await self._get_http().post(
+                        self.config.analytics_webhook,
+                        json=payload,
+                        timeout=5.0,
+                    )
+            except Exception:
+                # Silently fail - don't block payment processing
+                pass
+            finally:
+                self._webhook_queue.task_done()
     
     def create_wallet(self, name: Optional[str] = None) -> Tuple[str, str]:
         """Create a new wallet for the provider"""
@@ -322,11 +491,11 @@ class X402Provider:
         
         # Track wallet creation
         if self.analytics and AnalyticsEvent:
-            asyncio.create_task(self.analytics.track_event(
+            self.analytics.enqueue_event(
                 AnalyticsEvent.WALLET_CREATED,
                 wallet_address=wallet_data["address"],
                 metadata={"type": "provider", "name": wallet_name}
-            ))
+            )
         
         return wallet_data["address"], wallet_data["private_key"]
     
@@ -9,6 +9,7 @@ Based on the enhanced RPC pattern for multi-chain DeFi applications.
 
 import os
 import asyncio
+import functools
 import json
 import logging
 from typing import Dict, List, Optional, Any, Tuple
@@ -754,6 +755,10 @@ class EnhancedRPCManager:
         self.current_rpc_index = defaultdict(int)
         self.logger = logging.getLogger(__name__)
         
+        # network -> (resolved_at, rpc_url) for get_fastest_rpc
+        self._fastest_cache: Dict[str, Tuple[float, str]] = {}
+        self.fastest_rpc_ttl = 60
+        
         # Initialize API keys from environment
         self.api_keys = {
             "alchemy": os.getenv("ALCHEMY_API_KEY", ""),
@@ -855,6 +860,7 @@ class EnhancedRPCManager:
                 return w3
             except Exception as e:
                 self.logger.warning(f"Health check failed for {network}: {e}")
+                self._fastest_cache.pop(network, None)
                 # Try to rotate to next RPC
                 if self._rotate_rpc(network):
                     return self.web3_instances.get(network)
@@ -938,8 +944,13 @@ class EnhancedRPCManager:
         network_info = self.get_network_info(network)
         return network_info.native_currency if network_info else None
     
-    async def health_check_all(self) -> Dict[str, Any]:
-        """Perform health check on all networks"""
+    async def health_check_all(self, timeout: float = 5.0, max_concurrency: int = 10) -> Dict[str, Any]:
+        """Perform health check on all networks
+        
+        Networks are checked concurrently (at most ``max_concurrency`` at a time)
+        and each block-number call is bounded by ``timeout`` seconds, so one slow
+        RPC cannot hold up the aggregated status.
+        """
         health_status = {
             "timestamp": datetime.now().isoformat(),
             "networks": {},
@@ -950,37 +961,56 @@ class EnhancedRPCManager:
             }
         }
         
-        for network_key in NETWORK_CONFIGS.keys():
-            network_info = NETWORK_CONFIGS[network_key]
+        semaphore = asyncio.Semaphore(max_concurrency)
+        
+        async def _check_one(network_key: str) -> Optional[int]:
+            w3 = self.web3_instances[network_key]
+            async with semaphore:
+                # web3's HTTP provider is blocking, keep it off the event loop
+                return await asyncio.wait_for(
+                    asyncio.to_thread(lambda: w3.eth.block_number),
+                    timeout=timeout
+                )
+        
+        checked = [
+            network_key for network_key, network_info in NETWORK_CONFIGS.items()
+            if network_info.chain_type == ChainType.EVM and network_key in self.web3_instances
+        ]
+        results = dict(zip(
+            checked,
+            await asyncio.gather(*(_check_one(key) for key in checked), return_exceptions=True)
+        ))
+        
+        for network_key, network_info in NETWORK_CONFIGS.items():
+            base = {"name": network_info.name, "chain_id": network_info.chain_id}
             
-            if network_info.chain_type == ChainType.EVM and network_key in self.web3_instances:
-                try:
-                    w3 = self.web3_instances[network_key]
-                    block_number = w3.eth.block_number
-                    
-                    health_status["networks"][network_key] = {
-                        "status": "healthy",
-                        "block_number": block_number,
-                        "name": network_info.name,
-                        "chain_id": network_info.chain_id
-                    }
-                    health_status["summary"]["healthy"] += 1
-                    
-                except Exception as e:
-                    health_status["networks"][network_key] = {
-                        "status": "unhealthy",
-                        "error": str(e),
-                        "name": network_info.name,
-                        "chain_id": network_info.chain_id
-                    }
-                    health_status["summary"]["unhealthy"] += 1
-            else:
+            if isinstance(results.get(network_key), Exception):
+                self._fastest_cache.pop(network_key, None)
+            
+            if network_key not in results:
+                health_status["networks"][network_key] = {"status": "not_initialized", **base}
+                health_status["summary"]["unhealthy"] += 1
+            elif isinstance(results[network_key], asyncio.TimeoutError):
+                health_status["networks"][network_key] = {
+                    "status": "timeout",
+                    "error": f"No response within {timeout}s",
+                    **base
+                }
+                health_status["summary"]["unhealthy"] += 1
+            elif isinstance(results[network_key], Exception):
                 health_status["networks"][network_key] = {
-                    "status": "not_initialized",
-                    "name": network_info.name,
-                    "chain_id": network_info.chain_id
+                    "status": "unhealthy",
+                    "error": str(results[network_key]),
+                    **base
                 }
                 health_status["summary"]["unhealthy"] += 1
+            else:
+                health_status["networks"][network_key] = {
+                    "status": "healthy",
+                    "block_number": results[network_key],
+                    **base
+                }
+                health_status["summary"]["healthy"] += 1
             
             health_status["summary"]["total"] += 1
         
@@ -990,43 +1020,41 @@ class EnhancedRPCManager:
         """Get the fastest RPC endpoint for a network"""
         # This would implement latency testing
         # For now, return the first healthy one
+        network = network.lower()
+        cached = self._fastest_cache.get(network)
+        if cached and time.time() - cached[0] < self.fastest_rpc_ttl:
+            return cached[1]
+        
         network_info = self.get_network_info(network)
         if network_info:
             rpc_urls = self._substitute_api_keys(network_info.rpc_urls)
-            return next((url for url in rpc_urls if "${" not in url), None)
+            rpc_url = next((url for url in rpc_urls if "${" not in url), None)
+            if rpc_url:
+                self._fastest_cache[network] = (time.time(), rpc_url)
+            return rpc_url
         return None
 
-# Global RPC manager instance
-_rpc_manager = None
+# Global RPC manager instance, created on first use
+@functools.lru_cache(maxsize=1)
+def _manager() -> EnhancedRPCManager:
+    return EnhancedRPCManager()
 
 async def get_rpc_manager() -> EnhancedRPCManager:
     """Get global RPC manager instance"""
-    global _rpc_manager
-    if _rpc_manager is None:
-        _rpc_manager = EnhancedRPCManager()
-    return _rpc_manager
+    return _manager()
 
 def get_web3_for_chain(chain: str) -> Optional[Web3]:
     """Get Web3 instance for a chain (sync version)"""
-    global _rpc_manager
-    if _rpc_manager is None:
-        _rpc_manager = EnhancedRPCManager()
-    return _rpc_manager.get_web3(chain)
+    return _manager().get_web3(chain)
 
 def get_supported_chains(include_testnets: bool = False) -> List[str]:
     """Get list of supported blockchain networks"""
-    global _rpc_manager
-    if _rpc_manager is None:
-        _rpc_manager = EnhancedRPCManager()
-    return _rpc_manager.get_supported_networks(include_testnets)
+    return _manager().get_supported_networks(include_testnets)
 
-def get_chain_info(chain: str) -> Optional[Dict[str, Any]]:
-    """Get comprehensive chain information"""
-    global _rpc_manager
-    if _rpc_manager is None:
-        _rpc_manager = EnhancedRPCManager()
-    
-    network_info = _rpc_manager.get_network_info(chain)
+@functools.lru_cache(maxsize=32)
+def _chain_info(chain: str) -> Optional[Dict[str, Any]]:
+    """Chain metadata is static, so it is built once per chain and cached"""
+    network_info = _manager().get_network_info(chain)
     if network_info:
         return {
             "name": network_info.name,
@@ -1037,4 +1065,12 @@ def get_chain_info(chain: str) -> Optional[Dict[str, Any]]:
             "testnet": network_info.testnet,
             "rpc_endpoints": len(network_info.rpc_urls)
         }
-    return None
\ No newline at end of file
+    return None
+
+def get_chain_info(chain: str) -> Optional[Dict[str, Any]]:
+    """Get comprehensive chain information
+    
+    Each call gets its own copy, so callers can't alter the cached entry.
+    """
+    info = _chain_info(chain)
+    return dict(info) if info is not None else None
\ No newline at end of file
@@ -1,8 +1,12 @@
 """Security utilities for fast-x402"""
 
+import logging
 import re
+import time
 import secrets
-from typing import Optional, List
+from functools import lru_cache
+from typing import Optional, List, Tuple, FrozenSet
+from urllib.parse import urlparse
 from web3 import Web3
 from eth_utils import is_address
 
@@ -10,12 +14,28 @@ from .logger import logger
 from .exceptions import X402Error
 
 
+# Characters stripped from incoming nonces (anything that is not hex or the 0x prefix)
+_NONCE_RE = re.compile(r'[^0-9a-fA-Fx]')
+
+# Deletion table used to spot non-hex characters without a regex
+_HEX_TABLE = str.maketrans('', '', '0123456789abcdefABCDEF')
+
+
+@lru_cache(maxsize=4096)
+def _is_valid_address(address: str) -> bool:
+    """Cheap shape check first, full eth_utils (checksum) validation second"""
+    if len(address) != 42 or not address.startswith('0x') or address[2:].translate(_HEX_TABLE):
+        return False
+    
+    return is_address(address)
+
+
 def validate_address(address: str) -> bool:
     """Validate Ethereum address"""
     if not address:
         return False
     
-    if not is_address(address):
+    if not _is_valid_address(address):
         logger.warning(f"Invalid Ethereum address format: {address[:10]}...")
         return False
     
@@ -51,7 +71,7 @@ def validate_amount(amount: str, max_amount: Optional[str] = None) -> bool:
 def sanitize_nonce(nonce: str) -> str:
     """Sanitize nonce to prevent injection"""
     # Remove any non-hex characters
-    sanitized = re.sub(r'[^0-9a-fA-Fx]', '', nonce)
+    sanitized = _NONCE_RE.sub('', nonce)
     
     # Ensure it starts with 0x
     if not sanitized.startswith('0x'):
@@ -85,20 +105,36 @@ def validate_chain_id(chain_id: int, allowed_chains: Optional[List[int]] = None)
 
 def validate_url(url: str, allowed_domains: Optional[List[str]] = None) -> bool:
     """Validate URL and check against allowed domains"""
-    from urllib.parse import urlparse
-    
+    rejection = _url_rejection(url, tuple(allowed_domains) if allowed_domains else None)
+    if rejection is not None:
+        # Logged here rather than in the cached check, so every rejected
+        # attempt is recorded, not just the first
+        logger.log(*rejection)
+        return False
+    return True
+
+
+@lru_cache(maxsize=256)
+def _split_domains(allowed_domains: Tuple[str, ...]) -> Tuple[FrozenSet[str], Tuple[str, ...]]:
+    """Split allowed domains into exact hosts and wildcard suffixes"""
+    exact = frozenset(d for d in allowed_domains if not d.startswith('*.'))
+    wildcards = tuple(d[2:] for d in allowed_domains if d.startswith('*.'))
+    return exact, wildcards
+
+
+@lru_cache(maxsize=1024)
+def _url_rejection(url: str, allowed_domains: Optional[Tuple[str, ...]]) -> Optional[Tuple[int, str]]:
+    """Return why url fails validation as (log level, message), or None if valid"""
     try:
         parsed = urlparse(url)
         
         # Must have scheme and netloc
         if not parsed.scheme or not parsed.netloc:
-            logger.error(f"Invalid URL format: {url}")
-            return False
+            return logging.ERROR, f"Invalid URL format: {url}"
         
         # Must be http or https
         if parsed.scheme not in ['http', 'https']:
-            logger.error(f"Invalid URL scheme: {parsed.scheme}")
-            return False
+            return logging.ERROR, f"Invalid URL scheme: {parsed.scheme}"
         
         # Check against allowed domains if provided
         if allowed_domains:
@@ -106,27 +142,19 @@ def validate_url(url: str, allowed_domains: Optional[List[str]] = None) -> bool:
             # Remove port if present
             domain = domain.split(':')[0]
             
-            # Check if domain matches any allowed pattern
-            domain_allowed = False
-            for allowed in allowed_domains:
-                if allowed.startswith('*.'):
-                    # Wildcard subdomain
-                    if domain.endswith(allowed[2:]) or domain == allowed[2:]:
-                        domain_allowed = True
-                        break
-                elif domain == allowed:
-                    domain_allowed = True
-                    break
+            # Exact hosts are a set lookup, wildcard subdomains a suffix scan
+            exact, wildcards = _split_domains(allowed_domains)
+            domain_allowed = domain in exact or any(
+                domain.endswith(suffix) or domain == suffix for suffix in wildcards
+            )
             
             if not domain_allowed:
-                logger.warning(f"Domain {domain} not in allowed list")
-                return False
+                return logging.WARNING, f"Domain {domain} not in allowed list"
         
-        return True
+        return None
         
     except Exception as e:
-        logger.error(f"URL validation error: {e}")
-        return False
+        return logging.ERROR, f"URL validation error: {e}"
 
 
 def generate_secure_nonce() -> str:
@@ -152,8 +180,6 @@ class RateLimiter:
         
     def is_allowed(self, key: str) -> bool:
         """Check if request is allowed"""
-        import time
-        
         now = time.time()
         
         # Clean old entries
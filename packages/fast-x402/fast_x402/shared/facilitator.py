@@ -1,13 +1,17 @@
 """Facilitator service integration for x402 payments"""
 
 import asyncio
+import importlib.util
+import random
 import time
+from collections import OrderedDict
 from typing import Dict, Any, Optional, List
 from dataclasses import dataclass
 from enum import Enum
 import httpx
 
 from .analytics import get_analytics, AnalyticsEvent
+from . import jsonutil
 
 
 class PaymentStatus(str, Enum):
@@ -28,6 +32,9 @@ class FacilitatorConfig:
     timeout: int = 30
     retry_attempts: int = 3
     cache_ttl: int = 300  # 5 minutes
+    cache_max_entries: int = 10_000
+    batch_concurrency: int = 20  # max in-flight submissions per batch
+    http2: bool = True  # used only when the h2 package is installed
 
 
 class FacilitatorClient:
@@ -36,8 +43,73 @@ class FacilitatorClient:
     def __init__(self, config: FacilitatorConfig):
         self.config = config
         self.analytics = get_analytics()
-        self._payment_cache: Dict[str, Dict[str, Any]] = {}
+        # Insertion-ordered so the oldest (first to expire) entries sit at the front
+        self._payment_cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
         
+        # Flipped off the first time the facilitator rejects /payments/bulk
+        self._bulk_supported = True
+        
+        # One pooled client for every facilitator call, so connections
+        # (and their TLS sessions) are reused instead of rebuilt per request
+        headers = {}
+        if config.api_key:
+            headers["X-API-Key"] = config.api_key
+        # HTTP/2 lets concurrent batch requests share one connection; httpx
+        # negotiates it via ALPN and falls back to HTTP/1.1 otherwise
+        self._client = httpx.AsyncClient(
+            base_url=config.api_url,
+            timeout=config.timeout,
+            headers=headers,
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+            http2=config.http2 and importlib.util.find_spec("h2") is not None,
+        )
+    
+    async def close(self):
+        """Close the underlying HTTP client"""
+        await self._client.aclose()
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+    
+    async def _request(self, method: str, path: str, **kwargs) -> httpx.Response:
+        """Send a request, retrying transient failures with backoff and jitter
+        
+        GETs are retried on network errors and 5xx responses. Other methods
+        are only retried when the connection could not be established, so a
+        payment is never submitted twice.
+        """
+        
+        attempts = max(1, self.config.retry_attempts)
+        idempotent = method == "GET"
+        
+        for attempt in range(attempts):
+            try:
+                response = await self._client.request(method, path, **kwargs)
+                response.raise_for_status()
+                return response
+            except (httpx.TransportError, httpx.HTTPStatusError) as e:
+                if isinstance(e, httpx.HTTPStatusError):
+                    retryable = idempotent and e.response.status_code >= 500
+                else:
+                    retryable = idempotent or isinstance(e, (httpx.ConnectError, httpx.ConnectTimeout))
+                
+                if not retryable or attempt == attempts - 1:
+                    raise
+                
+                await asyncio.sleep(min(0.1 * 2 ** attempt, 5.0) + random.random() * 0.1)
+    
+    async def _post_json(self, path: str, payload: Dict[str, Any]) -> httpx.Response:
+        """POST a JSON body encoded with jsonutil (orjson when available)"""
+        return await self._request(
+            "POST",
+            path,
+            content=jsonutil.dumps(payload),
+            headers={"Content-Type": "application/json"},
+        )
+    
     async def submit_payment(self, 
                            payment_data: Dict[str, Any],
                            provider_address: str,
@@ -46,7 +118,7 @@ class FacilitatorClient:
         
         # Track facilitator usage
         if self.analytics:
-            await self.analytics.track_event(
+            self.analytics.enqueue_event(
                 AnalyticsEvent.FACILITATOR_VERIFICATION,
                 wallet_address=payment_data.get("from_address"),
                 provider_address=provider_address,
@@ -64,61 +136,55 @@ class FacilitatorClient:
         }
         
         # Submit to facilitator
-        async with httpx.AsyncClient(timeout=self.config.timeout) as client:
-            headers = {}
-            if self.config.api_key:
-                headers["X-API-Key"] = self.config.api_key
-                
-            response = await client.post(
-                f"{self.config.api_url}/payments",
-                json=request_data,
-                headers=headers,
-            )
-            response.raise_for_status()
-            
-            result = response.json()
-            payment_id = result["payment_id"]
-            
-            # Cache the payment
-            self._payment_cache[payment_id] = {
-                "status": PaymentStatus.PENDING,
-                "submitted_at": time.time(),
-                "data": result,
-            }
-            
-            return payment_id
+        response = await self._post_json("/payments", request_data)
+        
+        result = jsonutil.loads(response.content)
+        payment_id = result["payment_id"]
+        
+        # Cache the payment
+        self._cache_payment(payment_id, PaymentStatus.PENDING, result)
+        
+        return payment_id
     
-    async def check_payment_status(self, payment_id: str) -> Dict[str, Any]:
+    async def check_payment_status(self,
+                                 payment_id: str,
+                                 use_cache: bool = True) -> Dict[str, Any]:
         """Check the status of a payment in the facilitator"""
         
         # Check cache first
-        if payment_id in self._payment_cache:
-            cached = self._payment_cache[payment_id]
-            if time.time() - cached["submitted_at"] < self.config.cache_ttl:
-                return cached["data"]
+        cached = self._payment_cache.get(payment_id) if use_cache else None
+        if cached and time.monotonic() - cached["submitted_at"] < self.config.cache_ttl:
+            return cached["data"]
         
         # Query facilitator
-        async with httpx.AsyncClient(timeout=self.config.timeout) as client:
-            headers = {}
-            if self.config.api_key:
-                headers["X-API-Key"] = self.config.api_key
-                
-            response = await client.get(
-                f"{self.config.api_url}/payments/{payment_id}",
-                headers=headers,
-            )
-            response.raise_for_status()
-            
-            result = response.json()
-            
-            # Update cache
-            self._payment_cache[payment_id] = {
-                "status": result["status"],
-                "submitted_at": time.time(),
-                "data": result,
-            }
-            
-            return result
+        response = await self._request("GET", f"/payments/{payment_id}")
+        
+        result = jsonutil.loads(response.content)
+        
+        # Update cache
+        self._cache_payment(payment_id, result["status"], result)
+        
+        return result
+    
+    def _cache_payment(self, payment_id: str, status: str, data: Dict[str, Any]):
+        """Cache a payment, evicting expired entries and keeping the size bounded"""
+        
+        now = time.monotonic()  # cache ages are immune to wall-clock jumps
+        cache = self._payment_cache
+        cache[payment_id] = {
+            "status": status,
+            "submitted_at": now,
+            "data": data,
+        }
+        cache.move_to_end(payment_id)
+        
+        while cache:
+            oldest = next(iter(cache.values()))
+            if (len(cache) > self.config.cache_max_entries
+                    or now - oldest["submitted_at"] >= self.config.cache_ttl):
+                cache.popitem(last=False)
+            else:
+                break
     
     async def wait_for_payment(self, 
                              payment_id: str,
@@ -126,21 +192,47 @@ class FacilitatorClient:
         """Wait for a payment to complete"""
         
         timeout = timeout or self.config.timeout
-        start_time = time.time()
+        start_time = time.monotonic()
+        
+        # Poll quickly at first so fast payments are seen early, then back
+        # off exponentially (capped at 5s) to spare the facilitator
+        delay = 0.1
         
-        while time.time() - start_time < timeout:
-            status = await self.check_payment_status(payment_id)
+        while time.monotonic() - start_time < timeout:
+            # Bypass the cache, otherwise we'd keep seeing the submit-time status
+            status = await self.check_payment_status(payment_id, use_cache=False)
             
             if status["status"] in [PaymentStatus.COMPLETED, PaymentStatus.FAILED]:
                 return status
                 
-            await asyncio.sleep(1)  # Poll every second
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 5.0)
         
         raise TimeoutError(f"Payment {payment_id} did not complete within {timeout}s")
     
+    async def poll_many(self,
+                        payment_ids: List[str],
+                        timeout: Optional[int] = None) -> List[Any]:
+        """Wait for several payments concurrently
+        
+        Returns one entry per id: the final status, or the exception raised
+        while waiting (e.g. TimeoutError).
+        """
+        
+        semaphore = asyncio.Semaphore(self.config.batch_concurrency)
+        
+        async def _guarded_wait(payment_id: str) -> Dict[str, Any]:
+            async with semaphore:
+                return await self.wait_for_payment(payment_id, timeout)
+        
+        return await asyncio.gather(
+            *(_guarded_wait(payment_id) for payment_id in payment_ids),
+            return_exceptions=True
+        )
+    
     async def batch_submit_payments(self, 
-                                  payments: List[Dict[str, Any]]) -> List[str]:
-        """Submit multiple payments in a batch"""
+                                  payments: List[Dict[str, Any]]) -> List[Optional[str]]:
+        """Submit multiple payments in a batch; failed payments come back as None"""
         
         # Premium feature - check limit
         if self.analytics:
@@ -152,19 +244,33 @@ class FacilitatorClient:
             if not can_use:
                 raise ValueError("Batch payment limit reached")
         
-        payment_ids = []
+        # Prefer a single bulk request over one round-trip per payment
+        if self._bulk_supported:
+            try:
+                return await self._submit_bulk(payments)
+            except httpx.HTTPStatusError as e:
+                if e.response.status_code not in (404, 405, 501):
+                    raise
+                self._bulk_supported = False
         
-        # Submit payments concurrently
-        tasks = []
-        for payment in payments:
-            task = self.submit_payment(
-                payment["payment_data"],
-                payment["provider_address"],
-                payment.get("metadata")
-            )
-            tasks.append(task)
+        payment_ids: List[Optional[str]] = []
+        
+        # Submit payments concurrently, bounded so large batches don't
+        # exhaust the connection pool or trip facilitator rate limits
+        semaphore = asyncio.Semaphore(self.config.batch_concurrency)
+        
+        async def _guarded_submit(payment: Dict[str, Any]) -> str:
+            async with semaphore:
+                return await self.submit_payment(
+                    payment["payment_data"],
+                    payment["provider_address"],
+                    payment.get("metadata")
+                )
         
-        results = await asyncio.gather(*tasks, return_exceptions=True)
+        results = await asyncio.gather(
+            *(_guarded_submit(payment) for payment in payments),
+            return_exceptions=True
+        )
         
         for result in results:
             if isinstance(result, str):
@@ -174,6 +280,48 @@ class FacilitatorClient:
         
         return payment_ids
     
+    async def _submit_bulk(self, payments: List[Dict[str, Any]]) -> List[Optional[str]]:
+        """Submit a batch of payments through the facilitator's bulk endpoint"""
+        
+        request_data = {
+            "payments": [
+                {
+                    "payment": payment["payment_data"],
+                    "provider": payment["provider_address"],
+                    "metadata": payment.get("metadata") or {},
+                }
+                for payment in payments
+            ],
+            "webhook_url": self.config.webhook_url,
+            "timestamp": time.time(),
+        }
+        
+        response = await self._post_json("/payments/bulk", request_data)
+        
+        # One entry per submitted payment, null where the facilitator rejected it
+        payment_ids = jsonutil.loads(response.content)["payment_ids"]
+        
+        for payment, payment_id in zip(payments, payment_ids):
+            if payment_id is None:
+                continue
+            
+            self._cache_payment(
+                payment_id,
+                PaymentStatus.PENDING,
+                {"payment_id": payment_id, "status": PaymentStatus.PENDING},
+            )
+            
+            if self.analytics:
+                self.analytics.enqueue_event(
+                    AnalyticsEvent.FACILITATOR_VERIFICATION,
+                    wallet_address=payment["payment_data"].get("from_address"),
+                    provider_address=payment["provider_address"],
+                    amount=float(payment["payment_data"].get("value", 0)) / 1e6,
+                    metadata={"action": "submit"}
+                )
+        
+        return payment_ids
+    
     async def get_payment_history(self,
                                 wallet_address: Optional[str] = None,
                                 provider_address: Optional[str] = None,
@@ -186,19 +334,9 @@ class FacilitatorClient:
         if provider_address:
             params["provider"] = provider_address
         
-        async with httpx.AsyncClient(timeout=self.config.timeout) as client:
-            headers = {}
-            if self.config.api_key:
-                headers["X-API-Key"] = self.config.api_key
-                
-            response = await client.get(
-                f"{self.config.api_url}/payments",
-                params=params,
-                headers=headers,
-            )
-            response.raise_for_status()
-            
-            return response.json()["payments"]
+        response = await self._request("GET", "/payments", params=params)
+        
+        return jsonutil.loads(response.content)["payments"]
     
     async def register_provider(self,
                               provider_address: str,
@@ -211,35 +349,16 @@ class FacilitatorClient:
             "registered_at": time.time(),
         }
         
-        async with httpx.AsyncClient(timeout=self.config.timeout) as client:
-            headers = {}
-            if self.config.api_key:
-                headers["X-API-Key"] = self.config.api_key
-                
-            response = await client.post(
-                f"{self.config.api_url}/providers",
-                json=request_data,
-                headers=headers,
-            )
-            response.raise_for_status()
-            
-            return response.json()
+        response = await self._post_json("/providers", request_data)
+        
+        return jsonutil.loads(response.content)
     
     async def get_provider_stats(self, provider_address: str) -> Dict[str, Any]:
         """Get provider statistics from facilitator"""
         
-        async with httpx.AsyncClient(timeout=self.config.timeout) as client:
-            headers = {}
-            if self.config.api_key:
-                headers["X-API-Key"] = self.config.api_key
-                
-            response = await client.get(
-                f"{self.config.api_url}/providers/{provider_address}/stats",
-                headers=headers,
-            )
-            response.raise_for_status()
-            
-            return response.json()
+        response = await self._request("GET", f"/providers/{provider_address}/stats")
+        
+        return jsonutil.loads(response.content)
 
 
 class PremiumFacilitator(FacilitatorClient):
@@ -267,17 +386,9 @@ class PremiumFacilitator(FacilitatorClient):
             "requested_at": time.time(),
         }
         
-        async with httpx.AsyncClient(timeout=self.config.timeout) as client:
-            headers = {"X-API-Key": self.config.api_key}
-            
-            response = await client.post(
-                f"{self.config.api_url}/settlements/instant",
-                json=request_data,
-                headers=headers,
-            )
-            response.raise_for_status()
-            
-            return response.json()
+        response = await self._post_json("/settlements/instant", request_data)
+        
+        return jsonutil.loads(response.content)
     
     async def create_payment_link(self,
                                 amount: str,
@@ -293,32 +404,32 @@ class PremiumFacilitator(FacilitatorClient):
             "expires_at": time.time() + expires_in,
         }
         
-        async with httpx.AsyncClient(timeout=self.config.timeout) as client:
-            headers = {"X-API-Key": self.config.api_key}
-            
-            response = await client.post(
-                f"{self.config.api_url}/payment-links",
-                json=request_data,
-                headers=headers,
-            )
-            response.raise_for_status()
-            
-            return response.json()
+        response = await self._post_json("/payment-links", request_data)
+        
+        return jsonutil.loads(response.content)
     
     async def bulk_verification(self,
-                              payment_ids: List[str]) -> Dict[str, Dict[str, Any]]:
-        """Verify multiple payments in bulk (premium feature)"""
+                              payment_ids: List[str],
+                              wait_timeout: Optional[int] = None) -> Dict[str, Dict[str, Any]]:
+        """Verify multiple payments in bulk (premium feature)
+        
+        With ``wait_timeout``, payments still pending are polled concurrently
+        until they settle or the timeout passes.
+        """
         
         request_data = {"payment_ids": payment_ids}
         
-        async with httpx.AsyncClient(timeout=self.config.timeout) as client:
-            headers = {"X-API-Key": self.config.api_key}
-            
-            response = await client.post(
-                f"{self.config.api_url}/verify/bulk",
-                json=request_data,
-                headers=headers,
-            )
-            response.raise_for_status()
-            
-            return response.json()["results"]
\ No newline at end of file
+        response = await self._post_json("/verify/bulk", request_data)
+        
+        results = jsonutil.loads(response.content)["results"]
+        
+        if wait_timeout is not None:
+            pending = [
+                payment_id for payment_id, result in results.items()
+                if result.get("status") in (PaymentStatus.PENDING, PaymentStatus.PROCESSING)
+            ]
+            for payment_id, status in zip(pending, await self.poll_many(pending, wait_timeout)):
+                if isinstance(status, dict):
+                    results[payment_id] = status
+        
+        return results
@@ -1,18 +1,50 @@
 """Wallet creation and management utilities for x402 SDKs"""
 
+import logging
 import os
-import json
-from typing import Dict, Optional, Tuple
+from typing import Dict, Any, Optional, Tuple
 from pathlib import Path
 
+from Crypto.Cipher import AES
+from Crypto.Protocol.KDF import scrypt
 from eth_account import Account
 from mnemonic import Mnemonic
 
+from . import jsonutil
+
+logger = logging.getLogger(__name__)
+
+
+def _encrypt_secret(secret: str, password: str) -> Dict[str, str]:
+    """Encrypt a string with AES-GCM under a scrypt-derived key"""
+    salt = os.urandom(16)
+    key = scrypt(password, salt, 32, N=2**14, r=8, p=1)
+    cipher = AES.new(key, AES.MODE_GCM)
+    ciphertext, tag = cipher.encrypt_and_digest(secret.encode())
+    return {
+        "salt": salt.hex(),
+        "nonce": cipher.nonce.hex(),
+        "ciphertext": ciphertext.hex(),
+        "tag": tag.hex(),
+    }
+
+
+def _decrypt_secret(blob: Dict[str, str], password: str) -> str:
+    """Decrypt a value produced by _encrypt_secret"""
+    key = scrypt(password, bytes.fromhex(blob["salt"]), 32, N=2**14, r=8, p=1)
+    cipher = AES.new(key, AES.MODE_GCM, nonce=bytes.fromhex(blob["nonce"]))
+    return cipher.decrypt_and_verify(
+        bytes.fromhex(blob["ciphertext"]), bytes.fromhex(blob["tag"])
+    ).decode()
+
 
 class WalletManager:
     """Manages wallet creation and storage for x402 payments"""
     
-    def __init__(self, wallet_dir: Optional[str] = None, storage_dir: Optional[str] = None):
+    def __init__(self,
+                 wallet_dir: Optional[str] = None,
+                 storage_dir: Optional[str] = None,
+                 password: Optional[str] = None):
         # Support both wallet_dir and storage_dir for backward compatibility
         # storage_dir takes precedence if both are provided
         if storage_dir is not None:
@@ -24,6 +56,12 @@ class WalletManager:
         
         self.wallet_dir.mkdir(parents=True, exist_ok=True)
         
+        # Wallets are encrypted at rest whenever a password is available
+        self.password = password or os.environ.get("X402_WALLET_PASSWORD")
+        
+        # Decrypted wallets, so the scrypt cost is paid once per process
+        self._unlocked: Dict[str, Dict[str, str]] = {}
+        
     def create_wallet(self, name: str = "default") -> Dict[str, str]:
         """Create a new wallet with mnemonic phrase"""
         
@@ -42,13 +80,26 @@ class WalletManager:
             "mnemonic": mnemonic,
         }
         
-        # Save wallet (encrypted in production)
+        # Save wallet (encrypted when a password is configured)
         wallet_path = self.wallet_dir / f"{name}.json"
         if wallet_path.exists():
             raise ValueError(f"Wallet '{name}' already exists")
-            
-        with open(wallet_path, 'w') as f:
-            json.dump(wallet_data, f, indent=2)
+        
+        if self.password:
+            stored = {
+                "name": name,
+                "address": account.address,
+                "keystore": Account.encrypt(account.key, self.password),
+                "mnemonic": _encrypt_secret(mnemonic, self.password),
+            }
+        else:
+            logger.warning(
+                f"Saving wallet '{name}' unencrypted; pass a password or set "
+                "X402_WALLET_PASSWORD to encrypt it at rest"
+            )
+            stored = wallet_data
+        self._write_wallet_file(wallet_path, stored)
+        self._unlocked[name] = wallet_data
         
         print(f"🔐 Created new wallet: {name}")
         print(f"   Address: {wallet_data['address']}")
@@ -59,23 +110,48 @@ class WalletManager:
     def load_wallet(self, name: str = "default") -> Dict[str, str]:
         """Load an existing wallet"""
         
+        if name in self._unlocked:
+            return self._unlocked[name]
+        
         wallet_path = self.wallet_dir / f"{name}.json"
         if not wallet_path.exists():
             raise ValueError(f"Wallet '{name}' not found")
         
-        with open(wallet_path, 'r') as f:
-            wallet_data = json.load(f)
+        wallet_data = jsonutil.loads(wallet_path.read_bytes())
+        
+        if "keystore" in wallet_data:
+            if not self.password:
+                raise ValueError(f"Wallet '{name}' is encrypted; a password is required")
+            wallet_data = {
+                "name": wallet_data["name"],
+                "address": wallet_data["address"],
+                "private_key": Account.decrypt(wallet_data["keystore"], self.password).hex(),
+                "mnemonic": _decrypt_secret(wallet_data["mnemonic"], self.password),
+            }
         
+        self._unlocked[name] = wallet_data
         return wallet_data
     
+    def _write_wallet_file(self, wallet_path: Path, data: Dict[str, Any]):
+        """Write a wallet file atomically, readable only by the owner"""
+        
+        tmp_path = wallet_path.with_suffix(".tmp")
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(jsonutil.dumps(data, indent=True))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, wallet_path)
+    
     def list_wallets(self) -> list[str]:
         """List all available wallets"""
         
-        wallets = []
-        for wallet_file in self.wallet_dir.glob("*.json"):
-            wallets.append(wallet_file.stem)
-        
-        return wallets
+        with os.scandir(self.wallet_dir) as entries:
+            return [
+                entry.name[:-5]
+                for entry in entries
+                if entry.name.endswith(".json") and entry.is_file()
+            ]
     
     def export_wallet(self, name: str = "default", include_private_key: bool = False) -> Dict[str, str]:
         """Export wallet data (optionally without private key)"""
@@ -94,14 +170,18 @@ class WalletManager:
         return export_data
     
     def create_or_load_wallet(self, name: str = "default") -> Tuple[Dict[str, str], bool]:
-        """Create a new wallet or load existing one"""
+        """Create a new wallet or load existing one
         
-        try:
+        Only a missing wallet is created; errors loading an existing one
+        (such as a missing or wrong password) are raised to the caller.
+        """
+        
+        if name in self._unlocked or (self.wallet_dir / f"{name}.json").exists():
             wallet = self.load_wallet(name)
             return wallet, False  # loaded existing
-        except ValueError:
-            wallet = self.create_wallet(name)
-            return wallet, True  # created new
+        
+        wallet = self.create_wallet(name)
+        return wallet, True  # created new
 
 
 def generate_wallet() -> Dict[str, str]:
@@ -1,93 +1,311 @@
 """Payment verification utilities for fast-x402"""
 
 import time
-from typing import Dict, Any
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import Executor
+from functools import lru_cache
+from typing import List, Optional, Union
 from eth_account import Account
-from eth_account.messages import encode_typed_data
-from web3 import Web3
+from eth_utils import keccak
 
-from .models import PaymentData
-from .exceptions import InvalidSignatureError, PaymentExpiredError, InvalidPaymentError
+from .models import PaymentData, _hex_to_bytes, to_token_units
+from .exceptions import (
+    InvalidSignatureError,
+    PaymentExpiredError,
+    InvalidPaymentError,
+    InvalidAmountError,
+    InvalidRecipientError,
+)
+
+try:
+    import coincurve
+except ImportError:  # optional: pip install fast-x402[fast]
+    coincurve = None
+
+
+# EIP-712 type hashes for USDC's TransferWithAuthorization never change
+_DOMAIN_TYPEHASH = keccak(
+    text="EIP712Domain(string name,string version,uint256 chainId,address verifyingContract)"
+)
+_TRANSFER_TYPEHASH = keccak(
+    text="TransferWithAuthorization(address from,address to,uint256 value,uint256 validBefore,bytes32 nonce)"
+)
+_USDC_NAME_HASH = keccak(text="USDC")
+_USDC_VERSION_HASH = keccak(text="2")
+
+
+# Signatures that already recovered to their sender, keyed by a digest of the
+# signed fields and mapped to the time the entry stops being trusted
+_SIG_CACHE_MAX_ENTRIES = 100_000
+_SIG_CACHE_TTL = 3600
+_sig_cache: "OrderedDict[bytes, float]" = OrderedDict()
+_sig_cache_lock = threading.Lock()  # verification runs in worker threads
+
+
+def _sig_cache_key(payment_data: PaymentData) -> bytes:
+    """Digest every signed field, so a cached signature can't vouch for altered data"""
+    raw = "|".join((
+        payment_data.from_lc,
+        payment_data.to_lc,
+        payment_data.value,
+        payment_data.token_lc,
+        str(payment_data.chain_id),
+        str(payment_data.valid_before),
+        payment_data.nonce.lower(),
+        payment_data.signature.lower(),
+    ))
+    return hashlib.blake2b(raw.encode(), digest_size=16).digest()
+
+
+def _remember_signature(key: bytes, valid_before: int, now: float):
+    """Cache a verified signature until it expires, evicting least recently used"""
+    with _sig_cache_lock:
+        _sig_cache[key] = min(valid_before, now + _SIG_CACHE_TTL)
+        _sig_cache.move_to_end(key)
+        while len(_sig_cache) > _SIG_CACHE_MAX_ENTRIES:
+            _sig_cache.popitem(last=False)
+
+
+class NonceRegistry:
+    """Nonces of accepted payments, used to reject replays
+    
+    Entries are kept in acceptance order, mapped to the payment's valid_before.
+    A payment can only be replayed until it expires, so expired entries are
+    dropped from the front as new ones arrive.
+    """
+    
+    def __init__(self, max_entries: int = 1_000_000):
+        self.max_entries = max_entries
+        self._used: "OrderedDict[str, int]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def _key(payment_data: PaymentData) -> str:
+        # EIP-3009 nonces are unique per authorizer, not globally
+        return f"{payment_data.from_lc}:{payment_data.nonce.lower()}"
+    
+    def is_used(self, payment_data: PaymentData) -> bool:
+        """Check whether this payment's nonce was already accepted"""
+        return self._key(payment_data) in self._used
+    
+    def claim(self, payment_data: PaymentData) -> bool:
+        """Record a payment's nonce; returns False if it was already recorded"""
+        key = self._key(payment_data)
+        now = time.time()
+        with self._lock:
+            used = self._used
+            if key in used:
+                return False
+            used[key] = payment_data.valid_before
+            while used:
+                oldest = next(iter(used.values()))
+                if len(used) > self.max_entries or oldest < now:
+                    used.popitem(last=False)
+                else:
+                    break
+        return True
+
+
+# Required recipients/tokens come from a handful of configured addresses,
+# so their lower-cased forms are computed once and reused
+_lower = lru_cache(maxsize=256)(str.lower)
+_address_bytes = lru_cache(maxsize=256)(_hex_to_bytes)
+
+
+# Every field of both structs is a static type, so each ABI-encodes to one
+# 32-byte word and the encoding is a plain concatenation
+_ADDRESS_PAD = b"\x00" * 12
+
+
+def _address_word(address: bytes) -> bytes:
+    if len(address) != 20:
+        raise ValueError(f"Expected 20-byte address, got {len(address)}")
+    return _ADDRESS_PAD + address
+
+
+def _uint_word(value: int) -> bytes:
+    # Raises OverflowError for negative or > 2**256 - 1 values
+    return value.to_bytes(32, "big")
+
+
+def _bytes32_word(value: bytes) -> bytes:
+    if len(value) > 32:
+        raise ValueError(f"Expected at most 32 bytes, got {len(value)}")
+    return value.ljust(32, b"\x00")
+
+
+@lru_cache(maxsize=64)
+def _domain_separator(chain_id: int, token: str) -> bytes:
+    """EIP-712 domain separator of the USDC contract for a chain/token pair"""
+    return keccak(b"".join((
+        _DOMAIN_TYPEHASH,
+        _USDC_NAME_HASH,
+        _USDC_VERSION_HASH,
+        _uint_word(chain_id),
+        _address_word(_address_bytes(token)),
+    )))
+
+
+def _eip712_digest(payment_data: PaymentData) -> bytes:
+    """Compute the 32-byte EIP-712 digest the payer signed"""
+    struct_hash = keccak(b"".join((
+        _TRANSFER_TYPEHASH,
+        _address_word(payment_data.from_bytes),
+        _address_word(payment_data.to_bytes),
+        _uint_word(payment_data.value_int),
+        _uint_word(payment_data.valid_before),
+        _bytes32_word(_hex_to_bytes(payment_data.nonce)),
+    )))
+    domain = _domain_separator(payment_data.chain_id, payment_data.token_lc)
+    return keccak(b"\x19\x01" + domain + struct_hash)
+
+
+@lru_cache(maxsize=4096)
+def _recover_signer(msg_hash: bytes, sig_bytes: bytes) -> bytes:
+    """Recover the 20-byte signing address from a 65-byte r||s||v signature
+    
+    Memoised on (digest, signature): unlike the verified-signature cache this
+    also short-circuits repeats that fail the signer check or have expired.
+    """
+    if len(sig_bytes) != 65:
+        raise ValueError(f"Expected 65-byte signature, got {len(sig_bytes)}")
+    
+    if coincurve is None:
+        return _hex_to_bytes(Account._recover_hash(msg_hash, signature=sig_bytes))
+    
+    # libsecp256k1 wants the recovery id (0/1) rather than Ethereum's v (27/28)
+    v = sig_bytes[64]
+    recovery_id = v - 27 if v >= 27 else v
+    pubkey = coincurve.PublicKey.from_signature_and_message(
+        sig_bytes[:64] + bytes([recovery_id]), msg_hash, hasher=None
+    )
+    return keccak(pubkey.format(compressed=False)[1:])[-20:]
 
 
 def verify_eip712_signature(payment_data: PaymentData) -> bool:
     """Verify EIP-712 signature for payment authorization"""
     
-    # Construct EIP-712 message
-    message = {
-        "types": {
-            "EIP712Domain": [
-                {"name": "name", "type": "string"},
-                {"name": "version", "type": "string"},
-                {"name": "chainId", "type": "uint256"},
-                {"name": "verifyingContract", "type": "address"},
-            ],
-            "TransferWithAuthorization": [
-                {"name": "from", "type": "address"},
-                {"name": "to", "type": "address"},
-                {"name": "value", "type": "uint256"},
-                {"name": "validBefore", "type": "uint256"},
-                {"name": "nonce", "type": "bytes32"},
-            ],
-        },
-        "primaryType": "TransferWithAuthorization",
-        "domain": {
-            "name": "USDC",
-            "version": "2",
-            "chainId": payment_data.chain_id,
-            "verifyingContract": payment_data.token,
-        },
-        "message": {
-            "from": payment_data.from_address,
-            "to": payment_data.to,
-            "value": int(payment_data.value),
-            "validBefore": payment_data.valid_before,
-            "nonce": payment_data.nonce,
-        },
-    }
+    # Retries of an already verified payment skip ecrecover entirely
+    now = time.time()
+    cache_key = _sig_cache_key(payment_data)
+    with _sig_cache_lock:
+        expires_at = _sig_cache.get(cache_key)
+        if expires_at is not None:
+            if expires_at > now:
+                _sig_cache.move_to_end(cache_key)
+                return True
+            del _sig_cache[cache_key]
     
     try:
-        # Encode the structured data
-        encoded_message = encode_typed_data(message)
-        
-        # Recover signer from signature
-        recovered_address = Account.recover_message(
-            encoded_message, 
-            signature=payment_data.signature
-        )
+        # Hash the typed data directly (the domain half is cached), then
+        # recover through libsecp256k1 when it is available
+        msg_hash = _eip712_digest(payment_data)
+        recovered = _recover_signer(msg_hash, payment_data.sig_bytes)
         
         # Check if recovered address matches the from address
-        return recovered_address.lower() == payment_data.from_address.lower()
+        valid = recovered == payment_data.from_bytes
         
     except Exception as e:
         raise InvalidSignatureError(f"Signature verification failed: {str(e)}")
+    
+    if valid:
+        _remember_signature(cache_key, payment_data.valid_before, now)
+    return valid
+
+
+async def verify_eip712_signature_async(payment_data: PaymentData) -> bool:
+    """Verify EIP-712 signature in a worker thread
+    
+    Signer recovery (keccak + secp256k1) is CPU-bound; running it off the
+    event loop keeps other requests flowing while a payment is verified.
+    """
+    return await asyncio.to_thread(verify_eip712_signature, payment_data)
+
+
+async def verify_eip712_signatures_batch(
+    payments: List[PaymentData],
+    pool: Optional[Executor] = None,
+) -> List[bool]:
+    """Verify many signatures, recovering signers in parallel on ``pool``
+    
+    Digests are built here; only the secp256k1 recovery runs on the pool,
+    which is typically a ProcessPoolExecutor owned by the caller (the
+    event loop's default thread pool when None). Valid signatures are added
+    to the verified-signature cache, so a following verify_eip712_signature
+    for the same payment is a cache hit. Payments whose signature can't be
+    decoded or recovered count as invalid.
+    """
+    
+    loop = asyncio.get_running_loop()
+    
+    async def _recover(payment_data: PaymentData) -> Optional[bytes]:
+        try:
+            msg_hash = _eip712_digest(payment_data)
+            return await loop.run_in_executor(
+                pool, _recover_signer, msg_hash, payment_data.sig_bytes
+            )
+        except Exception:
+            return None
+    
+    recovered = await asyncio.gather(*(_recover(payment_data) for payment_data in payments))
+    
+    now = time.time()
+    results = []
+    for payment_data, signer in zip(payments, recovered):
+        try:
+            valid = signer is not None and signer == payment_data.from_bytes
+        except ValueError:
+            valid = False
+        if valid:
+            _remember_signature(_sig_cache_key(payment_data), payment_data.valid_before, now)
+        results.append(valid)
+    return results
 
 
 def verify_payment_requirements(
     payment_data: PaymentData,
-    required_amount: str,
+    required_amount: Union[str, int],
     required_token: str,
     required_recipient: str,
     required_chain_id: int,
-    scheme: str = "exact"
+    scheme: str = "exact",
+    nonces: Optional[NonceRegistry] = None,
+    now: Optional[int] = None,
 ) -> None:
-    """Verify payment meets all requirements"""
+    """Verify payment meets all requirements
+    
+    ``required_amount`` is either a decimal string ("0.10") or an int that is
+    already in token units. When ``nonces`` is given, nonces it has already
+    accepted are rejected as replays. ``now`` lets callers pass the Unix time
+    they already read for this request.
+    """
     
     # Check expiration
-    current_time = int(time.time())
+    current_time = int(time.time()) if now is None else now
     if payment_data.valid_before < current_time:
         raise PaymentExpiredError(
             f"Payment expired at {payment_data.valid_before}, current time: {current_time}"
         )
     
+    # Reject replays before any signature work
+    if nonces is not None and nonces.is_used(payment_data):
+        raise InvalidPaymentError("Nonce already used", "NONCE_REUSED")
+    
     # Check recipient
-    if payment_data.to.lower() != required_recipient.lower():
-        raise InvalidPaymentError(
+    try:
+        recipient_ok = payment_data.to_bytes == _address_bytes(required_recipient)
+    except ValueError:
+        recipient_ok = False
+    if not recipient_ok:
+        raise InvalidRecipientError(
             f"Expected recipient {required_recipient}, got {payment_data.to}"
         )
     
     # Check token
-    if payment_data.token.lower() != required_token.lower():
+    if payment_data.token_lc != _lower(required_token):
         raise InvalidPaymentError(
             f"Expected token {required_token}, got {payment_data.token}", "INVALID_TOKEN"
         )
@@ -99,17 +317,20 @@ def verify_payment_requirements(
         )
     
     # Check amount based on scheme
-    payment_amount = int(payment_data.value)
-    required_amount_wei = Web3.to_wei(float(required_amount), "mwei")  # USDC has 6 decimals
+    payment_amount = payment_data.value_int
+    if isinstance(required_amount, int):
+        required_amount_wei = required_amount
+    else:
+        required_amount_wei = to_token_units(required_amount)
     
     if scheme == "exact":
         if payment_amount != required_amount_wei:
-            raise InvalidPaymentError(
+            raise InvalidAmountError(
                 f"Expected exact amount {required_amount_wei}, got {payment_amount}"
             )
     elif scheme == "upto":
         if payment_amount > required_amount_wei:
-            raise InvalidPaymentError(
+            raise InvalidAmountError(
                 f"Payment amount {payment_amount} exceeds maximum {required_amount_wei}"
             )
     else:
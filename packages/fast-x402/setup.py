@@ -56,6 +56,7 @@ setup(
         "click>=8.0.0",
         "rich>=13.0.0",
         "mnemonic>=0.20",
+        "pycryptodome>=3.6.6",
         "uvicorn>=0.24.0",
     ],
     extras_require={
@@ -72,6 +73,11 @@ setup(
             "click>=8.0.0",
             "rich>=13.0.0",
         ],
+        "fast": [
+            "coincurve>=18.0.0",
+            "orjson>=3.9.0",
+            "httpx[http2]>=0.24.0",
+        ],
     },
     entry_points={
         "console_scripts": [
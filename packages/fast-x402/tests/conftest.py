@@ -9,4 +9,17 @@ def event_loop():
     """Create an instance of the default event loop for the test session."""
     loop = asyncio.get_event_loop_policy().new_event_loop()
     yield loop
-    loop.close()
\ No newline at end of file
+    loop.close()
+
+
+@pytest.fixture
+def fast_signature_check(monkeypatch):
+    """Accept every signature, for tests whose payments carry placeholder signatures
+    
+    Opt in with ``pytest.mark.usefixtures("fast_signature_check")``; real
+    signature verification stays in force everywhere else.
+    """
+    monkeypatch.setattr(
+        "fast_x402.verification.verify_eip712_signature",
+        lambda payment_data: True,
+    )
@@ -0,0 +1,35 @@
+"""Tests for the facilitator client"""
+
+import httpx
+import pytest
+
+from fast_x402.shared.facilitator import FacilitatorClient, FacilitatorConfig, PaymentStatus
+
+
+def _client(handler) -> FacilitatorClient:
+    """Create a facilitator client whose HTTP calls go to handler"""
+    client = FacilitatorClient(FacilitatorConfig(api_url="https://facilitator.test"))
+    client.analytics = None
+    client._client = httpx.AsyncClient(
+        base_url="https://facilitator.test",
+        transport=httpx.MockTransport(handler),
+    )
+    return client
+
+
+@pytest.mark.asyncio
+async def test_status_after_bulk_submit():
+    """Test payments submitted in bulk read back as pending from the cache"""
+    def handler(request: httpx.Request) -> httpx.Response:
+        assert request.method == "POST" and request.url.path == "/payments/bulk"
+        return httpx.Response(200, json={"payment_ids": ["pay_1", None]})
+    
+    payment = {"payment_data": {"value": "100000"}, "provider_address": "0xprovider"}
+    async with _client(handler) as client:
+        payment_ids = await client.batch_submit_payments([payment, payment])
+        assert payment_ids == ["pay_1", None]
+        
+        status = await client.check_payment_status("pay_1")
+    
+    assert status["payment_id"] == "pay_1"
+    assert status["status"] == PaymentStatus.PENDING
@@ -3,11 +3,15 @@
 import pytest
 from unittest.mock import Mock, patch
 import time
+import json
 import asyncio
 
 from fast_x402 import X402Provider, X402Config
 from fast_x402.models import PaymentRequirement, PaymentData
-from fast_x402.exceptions import InvalidPaymentError, InvalidAmountError
+from fast_x402.exceptions import InvalidPaymentError, InvalidAmountError, InvalidRecipientError
+
+# Payments below carry placeholder signatures
+pytestmark = pytest.mark.usefixtures("fast_signature_check")
 
 
 @pytest.fixture
@@ -69,13 +73,11 @@ class TestX402Provider:
         """Test successful payment verification"""
         requirement = provider.create_payment_requirement("0.10")
         
-        # Mock signature verification
-        with patch("fast_x402.verification.verify_eip712_signature", return_value=True):
-            verification = await provider.verify_payment(
-                payment_data,
-                requirement,
-                endpoint="/api/test"
-            )
+        verification = await provider.verify_payment(
+            payment_data,
+            requirement,
+            endpoint="/api/test"
+        )
         
         assert verification.valid is True
         assert verification.transaction_hash is not None
@@ -87,10 +89,10 @@ class TestX402Provider:
         requirement = provider.create_payment_requirement("0.10")
         payment_data.to = "0x0000000000000000000000000000000000000000"
         
-        with pytest.raises(InvalidPaymentError) as exc_info:
+        with pytest.raises(InvalidRecipientError) as exc_info:
             await provider.verify_payment(payment_data, requirement)
         
-        assert "Invalid recipient" in str(exc_info.value)
+        assert "Expected recipient" in str(exc_info.value)
     
     @pytest.mark.asyncio
     async def test_verify_payment_invalid_amount(self, provider, payment_data):
@@ -98,9 +100,8 @@ class TestX402Provider:
         requirement = provider.create_payment_requirement("1.00")  # Requires 1 USDC
         payment_data.value = "100000"  # Only 0.1 USDC
         
-        with patch("fast_x402.verification.verify_eip712_signature", return_value=True):
-            with pytest.raises(InvalidAmountError) as exc_info:
-                await provider.verify_payment(payment_data, requirement)
+        with pytest.raises(InvalidAmountError) as exc_info:
+            await provider.verify_payment(payment_data, requirement)
         
         assert "Expected exact amount" in str(exc_info.value)
     
@@ -120,16 +121,73 @@ class TestX402Provider:
         """Test payment caching"""
         requirement = provider.create_payment_requirement("0.10")
         
-        with patch("fast_x402.verification.verify_eip712_signature", return_value=True):
-            # First verification
-            verification1 = await provider.verify_payment(payment_data, requirement)
-            
-            # Second verification should use cache
-            verification2 = await provider.verify_payment(payment_data, requirement)
+        # First verification
+        verification1 = await provider.verify_payment(payment_data, requirement)
+        
+        # Second verification should use cache
+        verification2 = await provider.verify_payment(payment_data, requirement)
         
         assert verification1.transaction_hash == verification2.transaction_hash
         assert len(provider.payment_cache) == 1
     
+    @pytest.mark.asyncio
+    async def test_cache_is_keyed_on_requirement(self, provider, payment_data):
+        """Test a cached payment only satisfies the requirement it was verified for"""
+        requirement = provider.create_payment_requirement("0.10")
+        verification = await provider.verify_payment(payment_data, requirement)
+        
+        # Signature case doesn't change which cache entry is hit
+        upper = payment_data.model_copy(update={"signature": payment_data.signature.upper()})
+        cached = await provider.verify_payment(upper, requirement)
+        assert cached.transaction_hash == verification.transaction_hash
+        
+        # Another requirement misses the cache, so the spent nonce is caught
+        with pytest.raises(InvalidPaymentError, match="Nonce already used"):
+            await provider.verify_payment(payment_data, provider.create_payment_requirement("0.10", scheme="upto"))
+    
+    @pytest.mark.asyncio
+    async def test_cached_payment_replayed_against_new_requirement(self, provider, payment_data):
+        """Test a paid request's payment can't be replayed on the next 402 while cached"""
+        first = provider.create_payment_requirement("0.10")
+        await provider.verify_payment(payment_data, first)
+        
+        # Same terms, fresh nonce: exactly what the middleware issues per request
+        second = provider.create_payment_requirement("0.10")
+        with pytest.raises(InvalidPaymentError, match="Nonce already used"):
+            await provider.verify_payment(payment_data, second)
+        
+        assert provider.analytics_data["paid"] == 1
+    
+    @pytest.mark.asyncio
+    async def test_cached_payment_expires_with_payment(self, provider, payment_data):
+        """Test a cache hit is not served once the payment itself has expired"""
+        requirement = provider.create_payment_requirement("0.10")
+        await provider.verify_payment(payment_data, requirement)
+        
+        with patch("time.time", return_value=payment_data.valid_before + 1):
+            with pytest.raises(InvalidPaymentError, match="Payment expired"):
+                await provider.verify_payment(payment_data, requirement)
+    
+    @pytest.mark.asyncio
+    async def test_batch_process_pool_owned_by_provider(self, payment_data):
+        """Test the batch verification pool is sized from config and closed with the provider"""
+        config = X402Config(
+            wallet_address="0x742d35Cc6634C0532925a3b844Bc9e7595f6E123",
+            batch_verify_workers=1,
+        )
+        provider = X402Provider(config)
+        requirement = provider.create_payment_requirement("0.10")
+        
+        await provider.verify_payments_batch([payment_data], [requirement])
+        pool = provider._process_pool
+        assert pool is not None
+        assert pool._max_workers == 1
+        
+        await provider.aclose()
+        assert provider._process_pool is None
+        with pytest.raises(RuntimeError):
+            pool.submit(int)
+    
     @pytest.mark.asyncio
     async def test_custom_validation(self, payment_data):
         """Test custom validation callback"""
@@ -147,8 +205,7 @@ class TestX402Provider:
         provider = X402Provider(config)
         requirement = provider.create_payment_requirement("0.10")
         
-        with patch("fast_x402.verification.verify_eip712_signature", return_value=True):
-            verification = await provider.verify_payment(payment_data, requirement)
+        verification = await provider.verify_payment(payment_data, requirement)
         
         assert custom_called is True
         assert verification.valid is True
@@ -171,11 +228,10 @@ class TestX402Provider:
         requirement = provider.create_payment_requirement("0.10", endpoint="/api/test")
         
         # Process multiple payments
-        with patch("fast_x402.verification.verify_eip712_signature", return_value=True):
-            for i in range(3):
-                # Modify nonce to avoid cache
-                payment_data.nonce = f"0x{i:064x}"
-                await provider.verify_payment(payment_data, requirement, "/api/test")
+        for i in range(3):
+            # Modify nonce to avoid cache
+            payment_data.nonce = f"0x{i:064x}"
+            await provider.verify_payment(payment_data, requirement, "/api/test")
         
         analytics = provider.get_analytics()
         
@@ -191,11 +247,14 @@ class TestX402Provider:
         """Test webhook notification"""
         webhook_called = False
         webhook_data = None
+        done = asyncio.Event()
         
-        async def mock_post(url, json, timeout):
+        async def mock_post(url, content, headers, timeout):
             nonlocal webhook_called, webhook_data
             webhook_called = True
-            webhook_data = json
+            assert headers["Content-Type"] == "application/json"
+            webhook_data = json.loads(content)
+            done.set()
         
         config = X402Config(
             wallet_address="0x742d35Cc6634C0532925a3b844Bc9e7595f6E123",
@@ -204,12 +263,11 @@ class TestX402Provider:
         provider = X402Provider(config)
         requirement = provider.create_payment_requirement("0.10")
         
-        with patch("fast_x402.verification.verify_eip712_signature", return_value=True):
-            with patch("httpx.AsyncClient.post", side_effect=mock_post):
-                await provider.verify_payment(payment_data, requirement, "/api/test")
-        
-        # Give webhook task time to run
-        await asyncio.sleep(0.1)
+        with patch("httpx.AsyncClient.post", side_effect=mock_post):
+            await provider.verify_payment(payment_data, requirement, "/api/test")
+            
+            # Webhooks are sent from a background task; wait for its post
+            await asyncio.wait_for(done.wait(), timeout=1.0)
         
         assert webhook_called is True
         assert webhook_data["type"] == "payment_received"
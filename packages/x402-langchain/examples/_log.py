@@ -0,0 +1,28 @@
+"""Queued stdout logging shared by the examples
+
+print() writes to stdout from the event loop thread and can block it;
+records go through a queue and a background thread does the writing.
+"""
+
+import atexit
+import logging
+import logging.handlers
+import queue
+import sys
+
+_log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue()
+_stdout_handler = logging.StreamHandler(sys.stdout)
+_stdout_handler.setFormatter(logging.Formatter("%(message)s"))
+_log_listener = logging.handlers.QueueListener(_log_queue, _stdout_handler)
+_log_listener.start()
+atexit.register(_log_listener.stop)  # flush queued output on exit
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Return an INFO logger whose records are written by the shared listener"""
+    log = logging.getLogger(name)
+    if not log.handlers:
+        log.setLevel(logging.INFO)
+        log.propagate = False
+        log.addHandler(logging.handlers.QueueHandler(_log_queue))
+    return log
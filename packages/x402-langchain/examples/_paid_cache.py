@@ -0,0 +1,81 @@
+"""Short-lived cache of paid responses shared by the examples"""
+
+import asyncio
+import os
+import time
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from x402_langchain import X402Client
+from x402_langchain.models import PaymentResult
+
+# X402_CACHE_MODE values: "enabled" (default), "read-only" (serve hits,
+# store nothing new), "replay" (serve hits, fail on a miss, for
+# reproducible dry runs) or "disabled"
+CACHE_MODES = ("enabled", "read-only", "replay", "disabled")
+
+
+def cache_mode() -> str:
+    """Return X402_CACHE_MODE, rejecting values that aren't a known mode"""
+    mode = os.getenv("X402_CACHE_MODE", "enabled")
+    if mode not in CACHE_MODES:
+        raise ValueError(
+            f"Unknown X402_CACHE_MODE {mode!r}; expected one of {', '.join(CACHE_MODES)}"
+        )
+    return mode
+
+
+class PaidResponseCache:
+    """fetch_with_payment, reusing a paid response for ttl seconds
+    
+    Concurrent fetches of the same URL share one purchase. before_purchase,
+    if given, is awaited with (url, max_amount) right before each actual
+    purchase, e.g. to rate-limit paid calls.
+    """
+    
+    def __init__(self,
+                 client: X402Client,
+                 ttl: float = 30.0,
+                 before_purchase: Optional[Callable[[str, float], Awaitable[None]]] = None):
+        self.client = client
+        self.ttl = ttl
+        self.before_purchase = before_purchase
+        # url -> (monotonic expiry, paid result)
+        self._cache: Dict[str, Tuple[float, PaymentResult]] = {}
+        # url -> purchase currently in flight
+        self._inflight: Dict[str, "asyncio.Task[PaymentResult]"] = {}
+    
+    async def fetch(self, url: str, max_amount: float) -> PaymentResult:
+        """Return a fresh cached response for url, or pay for a new one"""
+        
+        mode = cache_mode()
+        if mode != "disabled":
+            entry = self._cache.get(url)
+            if entry is not None and time.monotonic() < entry[0]:
+                # Already paid for within the freshness window
+                return entry[1].model_copy(update={"amount": "0"})
+            if mode == "replay":
+                raise RuntimeError(f"No cached response for {url} (X402_CACHE_MODE=replay)")
+        
+        # Someone is already buying this URL; wait for their response
+        task = self._inflight.get(url)
+        if task is not None:
+            result = await asyncio.shield(task)
+            return result.model_copy(update={"amount": "0"})
+        
+        async def purchase() -> PaymentResult:
+            if self.before_purchase is not None:
+                await self.before_purchase(url, max_amount)
+            result = await self.client.fetch_with_payment(url=url, max_amount=max_amount)
+            if mode == "enabled" and result.success:
+                self._cache[url] = (time.monotonic() + self.ttl, result)
+            return result
+        
+        # Shielded, so a cancelled caller doesn't abort a purchase others share
+        task = asyncio.ensure_future(purchase())
+        self._inflight[url] = task
+        task.add_done_callback(lambda _: self._inflight.pop(url, None))
+        return await asyncio.shield(task)
+    
+    def next_expiry(self, default: float) -> float:
+        """Monotonic time the soonest cached response expires, or default if none"""
+        return min((expiry for expiry, _ in self._cache.values()), default=default)
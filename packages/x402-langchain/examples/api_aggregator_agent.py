@@ -1,14 +1,108 @@
 """Example of an agent that aggregates data from multiple paid APIs"""
 
 import os
+import re
+import time
 import asyncio
-from typing import List, Dict, Any
-from datetime import datetime
+from collections import Counter
+from functools import lru_cache
+from typing import List, Dict, Any, Optional, Tuple
+from urllib.parse import urlparse
 
 from langchain.tools import Tool
 from langchain_openai import ChatOpenAI
 from x402_langchain import create_x402_agent, X402Config, X402Client
 
+from _log import get_logger
+from _paid_cache import PaidResponseCache
+
+
+log = get_logger(__name__)
+
+
+# Satisfaction rates of sources we have paid before
+_TRUSTED_SOURCES = {
+    "api.premium-weather.x402.com": 0.95,
+    "data.financial-insights.x402.com": 0.90,
+    "ml.predictions.x402.com": 0.85,
+}
+
+# Financial sources, sorted once by priority and cost-effectiveness
+_FINANCIAL_SOURCES: Tuple[Dict[str, Any], ...] = tuple(sorted(
+    (
+        {
+            "name": "Technical Analysis API",
+            "url": "https://data.financial-insights.x402.com/technical/{symbol}",
+            "max_amount": 0.10,
+            "priority": "high"
+        },
+        {
+            "name": "Sentiment Analysis API",
+            "url": "https://sentiment.markets.x402.com/analyze/{symbol}",
+            "max_amount": 0.08,
+            "priority": "medium"
+        },
+        {
+            "name": "ML Predictions API",
+            "url": "https://ml.predictions.x402.com/forecast/{symbol}",
+            "max_amount": 0.15,
+            "priority": "high"
+        },
+    ),
+    key=lambda x: (x["priority"] != "high", x["max_amount"]),
+))
+
+
+@lru_cache(maxsize=1024)
+def _netloc(url: str) -> str:
+    """Host part of a URL; approvals see the same few URLs repeatedly"""
+    return urlparse(url).netloc
+
+
+# Query keywords that pull in weather and stock sections
+_WEATHER_RE = re.compile(r"weather|forecast", re.IGNORECASE)
+_SYMBOL_RE = re.compile(r"\b(AAPL|GOOGL|TSLA)\b", re.IGNORECASE)
+
+# Direction of each financial signal: +1 bullish, -1 bearish
+_SIGNAL_DIRECTION = {
+    "oversold": 1,
+    "positive_sentiment": 1,
+    "bullish_forecast": 1,
+    "overbought": -1,
+    "negative_sentiment": -1,
+    "bearish_forecast": -1,
+}
+
+
+def _technical_signal(data: Dict[str, Any]) -> Optional[str]:
+    rsi = data.get("rsi", 50)
+    if rsi < 30:
+        return "oversold"
+    if rsi > 70:
+        return "overbought"
+    return None
+
+
+def _sentiment_signal(data: Dict[str, Any]) -> Optional[str]:
+    score = data.get("score", 0)
+    if score > 0.7:
+        return "positive_sentiment"
+    if score < -0.7:
+        return "negative_sentiment"
+    return None
+
+
+def _prediction_signal(data: Dict[str, Any]) -> Optional[str]:
+    return {"up": "bullish_forecast", "down": "bearish_forecast"}.get(data.get("direction", ""))
+
+
+# Signal extractor for each financial source, looked up by source name
+_ANALYZERS = {
+    "Technical Analysis API": _technical_signal,
+    "Sentiment Analysis API": _sentiment_signal,
+    "ML Predictions API": _prediction_signal,
+}
+
 
 class APIAggregatorAgent:
     """Agent that intelligently aggregates data from multiple paid sources"""
@@ -29,44 +123,38 @@ class APIAggregatorAgent:
         self.client = X402Client(self.config)
         self.llm = ChatOpenAI(model="gpt-4", temperature=0)
         self.total_value_obtained = 0.0
+        self._paid = PaidResponseCache(self.client)
         
     async def approve_payment(self, url: str, amount: float) -> bool:
         """Smart payment approval logic"""
         
         # Always approve small amounts
         if amount <= 0.01:
-            print(f"✅ Auto-approved micro-payment: ${amount} to {url}")
+            log.info(f"✅ Auto-approved micro-payment: ${amount} to {url}")
             return True
         
         # Check ROI for known good sources
-        trusted_sources = {
-            "api.premium-weather.x402.com": 0.95,  # 95% satisfaction rate
-            "data.financial-insights.x402.com": 0.90,
-            "ml.predictions.x402.com": 0.85,
-        }
+        domain = _netloc(url)
         
-        from urllib.parse import urlparse
-        domain = urlparse(url).netloc
-        
-        if domain in trusted_sources:
-            satisfaction = trusted_sources[domain]
+        satisfaction = _TRUSTED_SOURCES.get(domain)
+        if satisfaction is not None:
             if amount <= 0.10 and satisfaction > 0.85:
-                print(f"✅ Approved payment to trusted source: ${amount} to {domain}")
+                log.info(f"✅ Approved payment to trusted source: ${amount} to {domain}")
                 return True
         
         # For unknown sources, be more careful
         if amount > 0.20:
-            print(f"❌ Rejected expensive payment: ${amount} to {url}")
+            log.info(f"❌ Rejected expensive payment: ${amount} to {url}")
             return False
         
         # Default: approve moderate amounts
-        print(f"✅ Approved payment: ${amount} to {url}")
+        log.info(f"✅ Approved payment: ${amount} to {url}")
         return True
     
     async def get_weather_forecast(self, location: str) -> Dict[str, Any]:
         """Get weather forecast from multiple sources and aggregate"""
         
-        print(f"\n🌤️  Fetching weather for {location}...")
+        log.info(f"\n🌤️  Fetching weather for {location}...")
         
         sources = [
             {
@@ -83,23 +171,16 @@ class APIAggregatorAgent:
         
         results = []
         
-        for source in sources:
-            try:
-                result = await self.client.fetch_with_payment(
-                    url=source["url"],
-                    max_amount=source["max_amount"]
-                )
-                
-                if result.success:
-                    results.append({
-                        "source": source["name"],
-                        "data": result.data,
-                        "cost": float(result.amount)
-                    })
-                    self.total_value_obtained += source["max_amount"] * 2  # Assume 2x value
-                    
-            except Exception as e:
-                print(f"   ❌ Failed to fetch from {source['name']}: {e}")
+        for source, result in zip(sources, await self._fetch_all(sources)):
+            if isinstance(result, Exception):
+                log.info(f"   ❌ Failed to fetch from {source['name']}: {result}")
+            elif result.success:
+                results.append({
+                    "source": source["name"],
+                    "data": result.data,
+                    "cost": float(result.amount)
+                })
+                self.total_value_obtained += source["max_amount"] * 2  # Assume 2x value
         
         # Aggregate results
         if results:
@@ -110,55 +191,35 @@ class APIAggregatorAgent:
     async def get_financial_insights(self, symbol: str) -> Dict[str, Any]:
         """Get financial insights from multiple premium sources"""
         
-        print(f"\n💰 Fetching financial insights for {symbol}...")
+        log.info(f"\n💰 Fetching financial insights for {symbol}...")
         
         sources = [
-            {
-                "name": "Technical Analysis API",
-                "url": f"https://data.financial-insights.x402.com/technical/{symbol}",
-                "max_amount": 0.10,
-                "priority": "high"
-            },
-            {
-                "name": "Sentiment Analysis API",
-                "url": f"https://sentiment.markets.x402.com/analyze/{symbol}",
-                "max_amount": 0.08,
-                "priority": "medium"
-            },
-            {
-                "name": "ML Predictions API",
-                "url": f"https://ml.predictions.x402.com/forecast/{symbol}",
-                "max_amount": 0.15,
-                "priority": "high"
-            }
+            {**source, "url": source["url"].format(symbol=symbol)}
+            for source in _FINANCIAL_SOURCES
         ]
         
-        # Sort by priority and cost-effectiveness
-        sources.sort(key=lambda x: (x["priority"] != "high", x["max_amount"]))
+        # Pick the sources that fit the request budget up front, so they
+        # can all be fetched at once
+        selected = []
+        budgeted = 0.0
+        for source in sources:
+            remaining_budget = self.config.spending_limits.per_request - budgeted
+            if remaining_budget < source["max_amount"]:
+                log.info(f"   ⚠️  Skipping {source['name']} - would exceed request limit")
+                continue
+            selected.append(source)
+            budgeted += source["max_amount"]
         
         insights = {}
         total_cost = 0.0
         
-        for source in sources:
-            # Check if we have budget
-            remaining_budget = self.config.spending_limits.per_request - total_cost
-            if remaining_budget < source["max_amount"]:
-                print(f"   ⚠️  Skipping {source['name']} - would exceed request limit")
-                continue
-            
-            try:
-                result = await self.client.fetch_with_payment(
-                    url=source["url"],
-                    max_amount=source["max_amount"]
-                )
-                
-                if result.success:
-                    insights[source["name"]] = result.data
-                    total_cost += float(result.amount)
-                    self.total_value_obtained += source["max_amount"] * 3  # High value data
-                    
-            except Exception as e:
-                print(f"   ❌ Failed to fetch from {source['name']}: {e}")
+        for source, result in zip(selected, await self._fetch_all(selected)):
+            if isinstance(result, Exception):
+                log.info(f"   ❌ Failed to fetch from {source['name']}: {result}")
+            elif result.success:
+                insights[source["name"]] = result.data
+                total_cost += float(result.amount)
+                self.total_value_obtained += source["max_amount"] * 3  # High value data
         
         return {
             "symbol": symbol,
@@ -171,8 +232,8 @@ class APIAggregatorAgent:
     async def create_comprehensive_report(self, query: str) -> str:
         """Create a comprehensive report by aggregating multiple data sources"""
         
-        print(f"\n📊 Creating comprehensive report for: {query}")
-        print("="*60)
+        log.info(f"\n📊 Creating comprehensive report for: {query}")
+        log.info("="*60)
         
         # Parse the query to extract relevant parameters
         # In production, use NLP to extract entities
@@ -180,7 +241,7 @@ class APIAggregatorAgent:
         report_sections = []
         
         # Section 1: Weather data (if location mentioned)
-        if "weather" in query.lower() or "forecast" in query.lower():
+        if _WEATHER_RE.search(query):
             weather_data = await self.get_weather_forecast("New York")
             report_sections.append({
                 "title": "Weather Forecast",
@@ -188,8 +249,9 @@ class APIAggregatorAgent:
             })
         
         # Section 2: Financial data (if stock symbol mentioned)
-        if any(symbol in query.upper() for symbol in ["AAPL", "GOOGL", "TSLA"]):
-            symbol = "AAPL"  # Default for demo
+        symbol_match = _SYMBOL_RE.search(query)
+        if symbol_match:
+            symbol = symbol_match.group(1).upper()
             financial_data = await self.get_financial_insights(symbol)
             report_sections.append({
                 "title": f"Financial Analysis - {symbol}",
@@ -212,11 +274,11 @@ class APIAggregatorAgent:
         spending_status = self.client.get_spending_status()
         roi = self.total_value_obtained / max(spending_status["spent_today"], 0.01)
         
-        print(f"\n💵 Report Generation Complete:")
-        print(f"   Total spent: ${spending_status['spent_today']:.2f}")
-        print(f"   Value obtained: ${self.total_value_obtained:.2f}")
-        print(f"   ROI: {roi:.1f}x")
-        print("="*60)
+        log.info(f"\n💵 Report Generation Complete:")
+        log.info(f"   Total spent: ${spending_status['spent_today']:.2f}")
+        log.info(f"   Value obtained: ${self.total_value_obtained:.2f}")
+        log.info(f"   ROI: {roi:.1f}x")
+        log.info("="*60)
         
         return report
     
@@ -235,7 +297,7 @@ class APIAggregatorAgent:
         
         return {
             "average_temperature": sum(temps) / len(temps) if temps else None,
-            "conditions": max(set(conditions), key=conditions.count) if conditions else "Unknown",
+            "conditions": Counter(conditions).most_common(1)[0][0] if conditions else "Unknown",
             "sources": len(results),
             "confidence": min(0.95, len(results) * 0.3),
             "total_cost": sum(r["cost"] for r in results)
@@ -246,34 +308,18 @@ class APIAggregatorAgent:
         
         signals = []
         
-        if "Technical Analysis API" in insights:
-            ta_data = insights["Technical Analysis API"]
-            if ta_data.get("rsi", 50) < 30:
-                signals.append("oversold")
-            elif ta_data.get("rsi", 50) > 70:
-                signals.append("overbought")
-        
-        if "Sentiment Analysis API" in insights:
-            sentiment = insights["Sentiment Analysis API"]
-            if sentiment.get("score", 0) > 0.7:
-                signals.append("positive_sentiment")
-            elif sentiment.get("score", 0) < -0.7:
-                signals.append("negative_sentiment")
-        
-        if "ML Predictions API" in insights:
-            ml_pred = insights["ML Predictions API"]
-            if ml_pred.get("direction", "") == "up":
-                signals.append("bullish_forecast")
-            elif ml_pred.get("direction", "") == "down":
-                signals.append("bearish_forecast")
-        
-        # Determine overall recommendation
-        bullish_signals = sum(1 for s in signals if s in ["oversold", "positive_sentiment", "bullish_forecast"])
-        bearish_signals = sum(1 for s in signals if s in ["overbought", "negative_sentiment", "bearish_forecast"])
-        
-        if bullish_signals > bearish_signals:
+        for name, data in insights.items():
+            analyzer = _ANALYZERS.get(name)
+            signal = analyzer(data) if analyzer else None
+            if signal:
+                signals.append(signal)
+        
+        # Determine overall recommendation: bullish minus bearish signals
+        balance = sum(_SIGNAL_DIRECTION[s] for s in signals)
+        
+        if balance > 0:
             recommendation = "BUY"
-        elif bearish_signals > bullish_signals:
+        elif balance < 0:
             recommendation = "SELL"
         else:
             recommendation = "HOLD"
@@ -316,49 +362,60 @@ class APIAggregatorAgent:
         
         results = {}
         
-        for api in apis:
-            try:
-                result = await self.client.fetch_with_payment(
-                    url=api["url"],
-                    max_amount=api["max_amount"]
-                )
-                
-                if result.success:
-                    results[api["name"]] = result.data
-                    
-            except Exception as e:
-                print(f"   ❌ Failed to fetch from {api['name']}: {e}")
+        for api, result in zip(apis, await self._fetch_all(apis)):
+            if isinstance(result, Exception):
+                log.info(f"   ❌ Failed to fetch from {api['name']}: {result}")
+            elif result.success:
+                results[api["name"]] = result.data
         
         return results
     
+    async def _fetch_all(self, sources: List[Dict[str, Any]]) -> List[Any]:
+        """Fetch all sources concurrently; a failed fetch yields its exception"""
+        
+        # Payments in this fan-out are approved together
+        async with self.client.batch():
+            return await asyncio.gather(
+                *(
+                    self._paid.fetch(
+                        url=source["url"],
+                        max_amount=source["max_amount"]
+                    )
+                    for source in sources
+                ),
+                return_exceptions=True
+            )
+    
     def _format_report(self, query: str, sections: List[Dict[str, Any]]) -> str:
         """Format the final report"""
         
-        report = f"# Comprehensive Report\n\n"
-        report += f"**Query**: {query}\n"
-        report += f"**Generated**: {datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S UTC')}\n\n"
+        # Collect the pieces and join once instead of growing a string
+        parts = [
+            "# Comprehensive Report\n\n",
+            f"**Query**: {query}\n",
+            f"**Generated**: {time.strftime('%Y-%m-%d %H:%M:%S UTC', time.gmtime())}\n\n",
+        ]
         
         for section in sections:
-            report += f"## {section['title']}\n\n"
+            parts.append(f"## {section['title']}\n\n")
             
             # Format content based on type
             content = section['content']
             if isinstance(content, dict):
                 for key, value in content.items():
                     if isinstance(value, dict):
-                        report += f"**{key}**:\n"
-                        for k, v in value.items():
-                            report += f"  - {k}: {v}\n"
+                        parts.append(f"**{key}**:\n")
+                        parts.extend(f"  - {k}: {v}\n" for k, v in value.items())
                     else:
-                        report += f"- **{key}**: {value}\n"
+                        parts.append(f"- **{key}**: {value}\n")
             else:
-                report += f"{content}\n"
+                parts.append(f"{content}\n")
             
-            report += "\n"
+            parts.append("\n")
         
-        report += f"\n---\n*Report generated using x402 payment protocol*"
+        parts.append("\n---\n*Report generated using x402 payment protocol*")
         
-        return report
+        return "".join(parts)
 
 
 async def main():
@@ -379,11 +436,11 @@ async def main():
     for query in queries:
         report = await agent.create_comprehensive_report(query)
         
-        print("\n" + "="*60)
-        print("FINAL REPORT:")
-        print("="*60)
-        print(report)
-        print("="*60 + "\n")
+        log.info("\n" + "="*60)
+        log.info("FINAL REPORT:")
+        log.info("="*60)
+        log.info(report)
+        log.info("="*60 + "\n")
         
         await asyncio.sleep(2)
 
@@ -1,17 +1,48 @@
 """Example of an autonomous trading agent that pays for real-time data"""
 
 import os
+import time
 import asyncio
-from datetime import datetime
 from typing import Dict, Any
+from urllib.parse import urlparse
 from langchain_openai import ChatOpenAI
 from x402_langchain import X402Client, X402Config, create_x402_agent
+from x402_langchain.models import PaymentResult
+
+from _log import get_logger
+from _paid_cache import PaidResponseCache
+
+
+log = get_logger(__name__)
+
+
+class TokenBucket:
+    """Paces requests to rate_per_sec on average, allowing bursts up to capacity"""
+    
+    def __init__(self, rate_per_sec: float, capacity: float):
+        self.rate = rate_per_sec
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+    
+    async def acquire(self, n: float = 1):
+        """Wait until n tokens are available, then take them"""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= n:
+                    self.tokens -= n
+                    return
+                await asyncio.sleep((n - self.tokens) / self.rate)
 
 
 class AutonomousTradingAgent:
     """Trading agent that purchases real-time market data"""
     
-    def __init__(self, private_key: str, initial_capital: float = 10000.0):
+    def __init__(self, private_key: str, initial_capital: float = 10000.0, max_concurrency: int = 5):
         self.config = X402Config(
             private_key=private_key,
             spending_limits={
@@ -34,29 +65,43 @@ class AutonomousTradingAgent:
         self.positions: Dict[str, float] = {}
         self.trades_today = 0
         self.pnl = 0.0
+        self.max_concurrency = max_concurrency
+        self._buckets: Dict[str, TokenBucket] = {}
+        # Purchases wait on their domain's bucket; cache hits don't
+        self._paid = PaidResponseCache(
+            self.client,
+            before_purchase=lambda url, cost: self._bucket_for(url, cost).acquire(),
+        )
     
     async def get_market_data(self, symbol: str) -> Dict[str, Any]:
         """Purchase real-time market data for a symbol"""
         
-        # Get price data
         price_url = f"https://realtime.iex.example.com/quote/{symbol}"
-        price_result = await self.client.fetch_with_payment(
-            url=price_url,
-            max_amount=0.10  # $0.10 for price data
-        )
-        
-        # Get sentiment data
         sentiment_url = f"https://sentiment.newsapi.example.com/analysis/{symbol}"
-        sentiment_result = await self.client.fetch_with_payment(
-            url=sentiment_url,
-            max_amount=0.25  # $0.25 for sentiment analysis
+        technical_url = f"https://api.alphawave.example.com/indicators/{symbol}"
+        
+        # The three purchases are independent, so make them concurrently
+        results = await asyncio.gather(
+            self._paid.fetch(
+                url=price_url,
+                max_amount=0.10  # $0.10 for price data
+            ),
+            self._paid.fetch(
+                url=sentiment_url,
+                max_amount=0.25  # $0.25 for sentiment analysis
+            ),
+            self._paid.fetch(
+                url=technical_url,
+                max_amount=0.15  # $0.15 for technical data
+            ),
+            return_exceptions=True
         )
         
-        # Get technical indicators
-        technical_url = f"https://api.alphawave.example.com/indicators/{symbol}"
-        technical_result = await self.client.fetch_with_payment(
-            url=technical_url,
-            max_amount=0.15  # $0.15 for technical data
+        # A failed fetch counts as an unsuccessful, unpaid result
+        price_result, sentiment_result, technical_result = (
+            PaymentResult(success=False, url=url, amount="0", token="", error=str(result))
+            if isinstance(result, Exception) else result
+            for url, result in zip((price_url, sentiment_url, technical_url), results)
         )
         
         return {
@@ -71,6 +116,15 @@ class AutonomousTradingAgent:
             ])
         }
     
+    def _bucket_for(self, url: str, cost: float) -> TokenBucket:
+        """Rate limiter for url's domain, sized so paid calls stay within the hourly limit"""
+        domain = urlparse(url).netloc
+        bucket = self._buckets.get(domain)
+        if bucket is None:
+            rate = self.config.spending_limits.per_hour / max(cost, 0.01) / 3600
+            bucket = self._buckets[domain] = TokenBucket(rate, capacity=5)
+        return bucket
+    
     async def analyze_opportunity(self, market_data: Dict[str, Any]) -> Dict[str, Any]:
         """Analyze trading opportunity based on purchased data"""
         
@@ -128,7 +182,7 @@ class AutonomousTradingAgent:
             self.positions[symbol] = position_size
             self.capital -= position_size
             self.trades_today += 1
-            print(f"📈 BOUGHT {symbol}: ${position_size:.2f} (confidence: {confidence:.1%})")
+            log.info(f"📈 BOUGHT {symbol}: ${position_size:.2f} (confidence: {confidence:.1%})")
             
         elif action == "sell" and symbol in self.positions:
             position = self.positions.pop(symbol)
@@ -137,72 +191,97 @@ class AutonomousTradingAgent:
             self.capital += position + pnl
             self.pnl += pnl
             self.trades_today += 1
-            print(f"📉 SOLD {symbol}: ${position:.2f}, P&L: ${pnl:.2f}")
+            log.info(f"📉 SOLD {symbol}: ${position:.2f}, P&L: ${pnl:.2f}")
+    
+    async def _process_symbol(self, symbol: str, sem: asyncio.Semaphore) -> float:
+        """Buy data for one symbol, analyze it and trade; returns the data cost"""
+        
+        data_cost = 0.0
+        
+        async with sem:
+            log.info(f"\n🔍 Analyzing {symbol}...")
+            
+            try:
+                # Get market data (this costs money!)
+                market_data = await self.get_market_data(symbol)
+                data_cost = market_data["data_cost"]
+                
+                log.info(f"💰 Data purchased for ${data_cost:.2f}")
+                
+                # Analyze opportunity
+                analysis = await self.analyze_opportunity(market_data)
+                
+                log.info(f"📊 Analysis: {analysis['action'].upper()} "
+                         f"(confidence: {analysis['confidence']:.1%})")
+                log.info(f"   Reasons: {', '.join(analysis['reasons'])}")
+                
+                # Execute trade if confident
+                if analysis["confidence"] >= 0.5:
+                    await self.execute_trade(
+                        symbol,
+                        analysis["action"],
+                        analysis["confidence"]
+                    )
+                
+            except Exception as e:
+                log.info(f"❌ Error analyzing {symbol}: {e}")
+        
+        return data_cost
     
     async def run_trading_session(self, symbols: list, duration_minutes: int = 5):
         """Run an automated trading session"""
         
-        print(f"\n🤖 Starting Autonomous Trading Session")
-        print(f"📊 Initial Capital: ${self.capital:.2f}")
-        print(f"💳 Data Budget: ${self.config.spending_limits.per_day:.2f}/day")
-        print(f"📈 Symbols: {', '.join(symbols)}")
-        print(f"⏱️  Duration: {duration_minutes} minutes")
-        print("\n")
+        log.info(f"\n🤖 Starting Autonomous Trading Session")
+        log.info(f"📊 Initial Capital: ${self.capital:.2f}")
+        log.info(f"💳 Data Budget: ${self.config.spending_limits.per_day:.2f}/day")
+        log.info(f"📈 Symbols: {', '.join(symbols)}")
+        log.info(f"⏱️  Duration: {duration_minutes} minutes")
+        log.info("\n")
         
-        start_time = datetime.now()
+        deadline = time.monotonic() + duration_minutes * 60
         session_spend = 0.0
+        sem = asyncio.Semaphore(self.max_concurrency)
         
-        while (datetime.now() - start_time).seconds < duration_minutes * 60:
-            for symbol in symbols:
-                print(f"\n🔍 Analyzing {symbol}...")
-                
-                try:
-                    # Get market data (this costs money!)
-                    market_data = await self.get_market_data(symbol)
-                    data_cost = market_data["data_cost"]
-                    session_spend += data_cost
-                    
-                    print(f"💰 Data purchased for ${data_cost:.2f}")
-                    
-                    # Analyze opportunity
-                    analysis = await self.analyze_opportunity(market_data)
-                    
-                    print(f"📊 Analysis: {analysis['action'].upper()} "
-                          f"(confidence: {analysis['confidence']:.1%})")
-                    print(f"   Reasons: {', '.join(analysis['reasons'])}")
-                    
-                    # Execute trade if confident
-                    if analysis["confidence"] >= 0.5:
-                        await self.execute_trade(
-                            symbol,
-                            analysis["action"],
-                            analysis["confidence"]
-                        )
-                    
-                except Exception as e:
-                    print(f"❌ Error analyzing {symbol}: {e}")
-                
-                # Don't hammer the APIs
-                await asyncio.sleep(10)
+        while time.monotonic() < deadline:
+            # Symbols are independent, so analyze up to max_concurrency at
+            # once; anything still running at the deadline is cancelled
+            tasks = [
+                asyncio.create_task(self._process_symbol(symbol, sem))
+                for symbol in symbols
+            ]
+            done, pending = await asyncio.wait(tasks, timeout=deadline - time.monotonic())
+            for task in pending:
+                task.cancel()
+            costs = [task.result() for task in done]
+            session_spend += sum(costs)
+            
+            if not any(costs) and not pending:
+                # Nothing was bought, so nothing changes until a cached
+                # response expires
+                now = time.monotonic()
+                next_expiry = self._paid.next_expiry(default=now)
+                wait = max(next_expiry - now, 1.0)
+                await asyncio.sleep(min(wait, max(deadline - now, 0)))
             
             # Status update
             spending_status = self.client.get_spending_status()
-            print(f"\n💵 Session spend: ${session_spend:.2f} | "
-                  f"Daily remaining: ${spending_status['remaining']['day']:.2f}")
+            log.info(f"\n💵 Session spend: ${session_spend:.2f} | "
+                     f"Daily remaining: ${spending_status['remaining']['day']:.2f}")
         
         # Final report
-        print(f"\n{'='*60}")
-        print(f"📊 TRADING SESSION COMPLETE")
-        print(f"{'='*60}")
-        print(f"⏱️  Duration: {duration_minutes} minutes")
-        print(f"💰 Total Data Spend: ${session_spend:.2f}")
-        print(f"📈 Trades Executed: {self.trades_today}")
-        print(f"💵 Final Capital: ${self.capital:.2f}")
-        print(f"📊 Total P&L: ${self.pnl:+.2f}")
-        print(f"🏆 ROI: {(self.pnl / 10000.0):.2%}")
-        print(f"\n💳 Payment Analytics:")
-        print(f"   Total requests: {spending_status['spent_today'] / 0.10:.0f}")
-        print(f"   Avg cost per request: ${session_spend / max(self.trades_today, 1):.3f}")
+        spending_status = self.client.get_spending_status()
+        log.info(f"\n{'='*60}")
+        log.info(f"📊 TRADING SESSION COMPLETE")
+        log.info(f"{'='*60}")
+        log.info(f"⏱️  Duration: {duration_minutes} minutes")
+        log.info(f"💰 Total Data Spend: ${session_spend:.2f}")
+        log.info(f"📈 Trades Executed: {self.trades_today}")
+        log.info(f"💵 Final Capital: ${self.capital:.2f}")
+        log.info(f"📊 Total P&L: ${self.pnl:+.2f}")
+        log.info(f"🏆 ROI: {(self.pnl / 10000.0):.2%}")
+        log.info(f"\n💳 Payment Analytics:")
+        log.info(f"   Total requests: {spending_status['request_count']}")
+        log.info(f"   Avg cost per request: ${spending_status['avg_cost']:.3f}")
 
 
 async def main():
@@ -1,6 +1,10 @@
 """Basic example of an AI agent that can make payments"""
 
 import os
+import ast
+import asyncio
+import operator
+from functools import lru_cache
 from langchain.agents import create_react_agent, AgentExecutor
 from langchain.tools import Tool
 from langchain_openai import ChatOpenAI
@@ -8,8 +12,46 @@ from langchain import hub
 
 from x402_langchain import create_x402_agent, create_x402_tool
 
+from _log import get_logger
+
+log = get_logger(__name__)
+
+# Arithmetic the calculator tool accepts; anything else is rejected
+_BIN_OPS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.Pow: operator.pow,
+    ast.Mod: operator.mod,
+}
+_UNARY_OPS = {
+    ast.UAdd: operator.pos,
+    ast.USub: operator.neg,
+}
+
+
+@lru_cache(maxsize=256)
+def _compile(expression: str) -> ast.expr:
+    """Parse an expression once; repeated calculations reuse the tree"""
+    return ast.parse(expression, mode="eval").body
+
+
+def _eval_expr(node: ast.expr) -> float:
+    """Evaluate a parsed arithmetic expression without eval()"""
+    if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)):
+        return node.value
+    if isinstance(node, ast.BinOp) and type(node.op) in _BIN_OPS:
+        left, right = _eval_expr(node.left), _eval_expr(node.right)
+        if isinstance(node.op, ast.Pow) and abs(right) > 100:
+            raise ValueError("Exponent too large")
+        return _BIN_OPS[type(node.op)](left, right)
+    if isinstance(node, ast.UnaryOp) and type(node.op) in _UNARY_OPS:
+        return _UNARY_OPS[type(node.op)](_eval_expr(node.operand))
+    raise ValueError(f"Unsupported expression: {ast.dump(node)}")
+
 # Example: Create a simple agent that can pay for data
-def main():
+async def main_async():
     # Get private key from environment
     private_key = os.getenv("AGENT_PRIVATE_KEY", "0x...")
     
@@ -33,9 +75,9 @@ def main():
     def calculate(expression: str) -> str:
         """Calculate a mathematical expression"""
         try:
-            result = eval(expression)
+            result = _eval_expr(_compile(expression))
             return f"The result is: {result}"
-        except:
+        except Exception:
             return "Invalid expression"
     
     calc_tool = Tool(
@@ -61,23 +103,28 @@ def main():
         "Calculate the ROI if Bitcoin goes from $50,000 to $75,000",
     ]
     
-    for query in queries:
-        print(f"\n{'='*60}")
-        print(f"Query: {query}")
-        print(f"{'='*60}")
-        
+    async def run_one(query: str):
         try:
-            result = agent.run(query)
-            print(f"Result: {result}")
+            result = f"Result: {await agent.arun(query)}"
         except Exception as e:
-            print(f"Error: {e}")
+            result = f"Error: {e}"
         
-        # Show spending report
+        # Log each query's output, with its spending report, as one record
+        # once it finishes, so concurrent queries don't interleave
         report = agent.get_spending_report()
-        print(f"\nSpending Report:")
-        print(f"  Total spent today: ${report['spent_today']:.2f}")
-        print(f"  Remaining today: ${report['remaining']['day']:.2f}")
+        log.info("\n".join([
+            f"\n{'='*60}",
+            f"Query: {query}",
+            f"{'='*60}",
+            result,
+            "\nSpending Report:",
+            f"  Total spent today: ${report['spent_today']:.2f}",
+            f"  Remaining today: ${report['remaining']['day']:.2f}",
+        ]))
+    
+    # The queries are independent, so let their LLM and payment calls overlap
+    await asyncio.gather(*(run_one(query) for query in queries))
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    asyncio.run(main_async())
\ No newline at end of file
@@ -1,14 +1,36 @@
 """Example of a multi-agent system with specialized payment roles"""
 
 import asyncio
+import math
 import os
-from typing import Dict, List, Any
-from dataclasses import dataclass
-from datetime import datetime
+import statistics
+import time
+from array import array
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Callable, Dict, List, Any, Mapping, Optional, Sequence, Tuple
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from functools import lru_cache
+from types import MappingProxyType
 
-from langchain.agents import Tool
-from langchain_openai import ChatOpenAI
-from x402_langchain import X402Client, X402Config, create_x402_agent
+from x402_langchain import X402Client, X402Config
+
+from _log import get_logger
+
+if TYPE_CHECKING:
+    from langchain_openai import ChatOpenAI
+
+
+log = get_logger(__name__)
+
+
+@lru_cache(maxsize=None)
+def get_llm(model: str = "gpt-4", temperature: float = 0) -> "ChatOpenAI":
+    """Return a shared chat model, so every agent reuses one OpenAI connection pool"""
+    # Imported here so the script starts without loading langchain
+    from langchain_openai import ChatOpenAI
+    
+    return ChatOpenAI(model=model, temperature=temperature)
 
 
 @dataclass
@@ -22,6 +44,126 @@ class MarketData:
     cost: float
 
 
+@dataclass
+class MarketDataBatch:
+    """Columnar market data for one research task
+    
+    Numeric fields are stored as contiguous double arrays so the analysis
+    reductions read a single column instead of chasing MarketData objects.
+    """
+    symbols: List[str] = field(default_factory=list)
+    prices: array = field(default_factory=lambda: array("d"))
+    volumes: array = field(default_factory=lambda: array("d"))
+    timestamps: List[datetime] = field(default_factory=list)
+    sources: List[str] = field(default_factory=list)
+    costs: array = field(default_factory=lambda: array("d"))
+    
+    def append(
+        self,
+        symbol: str,
+        price: float,
+        volume: float,
+        timestamp: datetime,
+        source: str,
+        cost: float,
+    ):
+        self.symbols.append(symbol)
+        self.prices.append(price)
+        self.volumes.append(volume)
+        self.timestamps.append(timestamp)
+        self.sources.append(source)
+        self.costs.append(cost)
+    
+    def __len__(self) -> int:
+        return len(self.prices)
+    
+    def __getitem__(self, i: int) -> MarketData:
+        return MarketData(
+            symbol=self.symbols[i],
+            price=self.prices[i],
+            volume=self.volumes[i],
+            timestamp=self.timestamps[i],
+            source=self.sources[i],
+            cost=self.costs[i],
+        )
+
+
+class PaidResultCache:
+    """Size-bounded TTL cache of purchased data, so repeat purchases are free"""
+    
+    def __init__(self, maxsize: int = 1024, ttl: float = 300.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        # key -> (monotonic expiry, data, cost paid)
+        self._entries: "OrderedDict[Tuple, Tuple[float, Any, float]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.dollars_saved = 0.0
+    
+    @staticmethod
+    def key(url: str, method: str = "GET", params: Optional[Dict[str, Any]] = None) -> Tuple:
+        return (method.upper(), url, tuple(sorted((params or {}).items())))
+    
+    def get(self, key: Tuple) -> Optional[Any]:
+        """Return cached data for key, or None if missing or expired"""
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        
+        self._entries.move_to_end(key)
+        self.hits += 1
+        self.dollars_saved += entry[2]
+        return entry[1]
+    
+    def put(self, key: Tuple, data: Any, cost: float):
+        """Store purchased data, evicting the least recently used past maxsize"""
+        self._entries[key] = (time.monotonic() + self.ttl, data, cost)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "dollars_saved": self.dollars_saved,
+            "entries": len(self._entries),
+        }
+
+
+# Read-only source listings shared by every ResearchAgent
+_MOCK_SOURCES: Mapping[str, Tuple[Mapping[str, Any], ...]] = MappingProxyType({
+    "market_data": (
+        MappingProxyType({
+            "name": "PremiumMarketData",
+            "url": "https://api.marketdata.x402.com/quote",
+            "cost": 0.05,
+            "quality_score": 0.95,
+            "features": ("real-time", "historical", "level-2")
+        }),
+        MappingProxyType({
+            "name": "BudgetMarketFeed",
+            "url": "https://budget.markets.x402.com/data",
+            "cost": 0.01,
+            "quality_score": 0.70,
+            "features": ("delayed-15min", "basic")
+        }),
+    ),
+    "news_sentiment": (
+        MappingProxyType({
+            "name": "AINewsSentiment",
+            "url": "https://sentiment.ainews.x402.com/analyze",
+            "cost": 0.10,
+            "quality_score": 0.90,
+            "features": ("ml-powered", "multi-source")
+        }),
+    ),
+})
+
+
 class ResearchAgent:
     """Agent responsible for finding data sources"""
     
@@ -29,44 +171,21 @@ class ResearchAgent:
         self.llm = llm
         self.discovered_sources = {}
     
-    async def find_data_sources(self, topic: str) -> List[Dict[str, Any]]:
+    async def find_data_sources(self, topic: str) -> Sequence[Mapping[str, Any]]:
         """Discover x402-enabled data sources for a topic"""
         
         # In production, this would query a registry or marketplace
-        mock_sources = {
-            "market_data": [
-                {
-                    "name": "PremiumMarketData",
-                    "url": "https://api.marketdata.x402.com/quote",
-                    "cost": 0.05,
-                    "quality_score": 0.95,
-                    "features": ["real-time", "historical", "level-2"]
-                },
-                {
-                    "name": "BudgetMarketFeed", 
-                    "url": "https://budget.markets.x402.com/data",
-                    "cost": 0.01,
-                    "quality_score": 0.70,
-                    "features": ["delayed-15min", "basic"]
-                }
-            ],
-            "news_sentiment": [
-                {
-                    "name": "AINewsSentiment",
-                    "url": "https://sentiment.ainews.x402.com/analyze",
-                    "cost": 0.10,
-                    "quality_score": 0.90,
-                    "features": ["ml-powered", "multi-source"]
-                }
-            ]
-        }
-        
-        sources = mock_sources.get(topic, [])
+        sources = _MOCK_SOURCES.get(topic, ())
         self.discovered_sources[topic] = sources
         
-        print(f"🔍 Research Agent: Found {len(sources)} sources for '{topic}'")
-        for source in sources:
-            print(f"   - {source['name']}: ${source['cost']} (quality: {source['quality_score']})")
+        # One record per listing, so concurrent tasks don't interleave lines
+        log.info("\n".join([
+            f"🔍 Research Agent: Found {len(sources)} sources for '{topic}'",
+            *(
+                f"   - {source['name']}: ${source['cost']} (quality: {source['quality_score']})"
+                for source in sources
+            ),
+        ]))
         
         return sources
 
@@ -74,60 +193,105 @@ class ResearchAgent:
 class PurchasingAgent:
     """Agent responsible for making payment decisions"""
     
+    # Whether a source is worth buying at each urgency, given (cost, quality)
+    _URGENCY_RULES: Dict[str, Callable[[float, float], bool]] = {
+        "high": lambda cost, quality: quality > 0.6,
+        "normal": lambda cost, quality: quality > 0.8 and cost < 0.10,
+        "low": lambda cost, quality: quality > 0.9 and cost < 0.05,
+    }
+    
     def __init__(self, x402_client: X402Client, budget: float = 10.0):
         self.client = x402_client
         self.budget = budget
         self.spent = 0.0
+        # Cost of approved purchases that haven't completed yet
+        self.reserved = 0.0
         self.purchases = []
+        self.cache = PaidResultCache()
     
-    async def evaluate_purchase(self, source: Dict[str, Any], urgency: str = "normal") -> bool:
-        """Evaluate whether to purchase from a source"""
+    async def evaluate_purchase(self, source: Mapping[str, Any], urgency: str = "normal") -> bool:
+        """Evaluate whether to purchase from a source
+        
+        An approved purchase reserves its cost against the budget until
+        purchase_data settles it, so concurrent purchases can't overspend.
+        """
         
         cost = source["cost"]
         quality = source["quality_score"]
         
         # Decision logic based on budget, quality, and urgency
-        if self.spent + cost > self.budget:
-            print(f"❌ Purchasing Agent: Over budget (would be ${self.spent + cost:.2f})")
+        committed = self.spent + self.reserved
+        if committed + cost > self.budget:
+            log.info(f"❌ Purchasing Agent: Over budget (would be ${committed + cost:.2f})")
             return False
         
-        if urgency == "high" and quality > 0.6:
-            return True
-        elif urgency == "normal" and quality > 0.8 and cost < 0.10:
-            return True
-        elif urgency == "low" and quality > 0.9 and cost < 0.05:
+        rule = self._URGENCY_RULES.get(urgency)
+        if rule is not None and rule(cost, quality):
+            # No await between the budget check and this update, so
+            # concurrent evaluations see each other's reservations
+            self.reserved += cost
             return True
         
-        print(f"🤔 Purchasing Agent: Skipping {source['name']} (cost/quality trade-off)")
+        log.info(f"🤔 Purchasing Agent: Skipping {source['name']} (cost/quality trade-off)")
         return False
     
-    async def purchase_data(self, source: Dict[str, Any]) -> Any:
-        """Execute purchase from a source"""
-        
-        print(f"💳 Purchasing Agent: Buying from {source['name']} for ${source['cost']}")
+    async def purchase_data(self, source: Mapping[str, Any]) -> Any:
+        """Execute a purchase approved by evaluate_purchase"""
         
         try:
+            key = PaidResultCache.key(source["url"])
+            cached = self.cache.get(key)
+            if cached is not None:
+                log.info(f"♻️  Purchasing Agent: Reusing {source['name']} data "
+                         f"(cache_hit=True, saved ${source['cost']})")
+                return cached
+            
+            log.info(f"💳 Purchasing Agent: Buying from {source['name']} for ${source['cost']}")
+            
             result = await self.client.fetch_with_payment(
                 url=source["url"],
                 max_amount=source["cost"] * 1.1  # 10% buffer
             )
             
             if result.success:
+                self.cache.put(key, result.data, source["cost"])
                 self.spent += source["cost"]
                 self.purchases.append({
                     "source": source["name"],
                     "cost": source["cost"],
-                    "timestamp": datetime.utcnow()
+                    "timestamp": datetime.now(timezone.utc)
                 })
-                print(f"✅ Purchase successful! Total spent: ${self.spent:.2f}")
+                log.info(f"✅ Purchase successful! Total spent: ${self.spent:.2f}")
                 return result.data
             else:
-                print(f"❌ Purchase failed: {result.error}")
+                log.info(f"❌ Purchase failed: {result.error}")
                 return None
                 
         except Exception as e:
-            print(f"❌ Purchase error: {e}")
+            log.info(f"❌ Purchase error: {e}")
             return None
+        finally:
+            # Settle the reservation made by evaluate_purchase
+            self.reserved -= source["cost"]
+    
+    async def purchase_batch(self, sources: Sequence[Mapping[str, Any]], concurrency: int = 8) -> List[Any]:
+        """Purchase several approved sources as one fan-out
+        
+        Runs inside client.batch() so every payment in the fan-out is put
+        to the approver together rather than one prompt per source.
+        """
+        sem = asyncio.Semaphore(concurrency)
+        
+        async def buy_one(source: Mapping[str, Any]) -> Any:
+            async with sem:
+                return await self.purchase_data(source)
+        
+        async with self.client.batch():
+            return await asyncio.gather(*(buy_one(source) for source in sources))
+    
+    def get_tool_cache_stats(self) -> Dict[str, Any]:
+        """Hit/miss counts and dollars saved by the purchase cache"""
+        return self.cache.stats()
 
 
 class AnalysisAgent:
@@ -137,23 +301,24 @@ class AnalysisAgent:
         self.llm = llm
         self.analyses = []
     
-    async def analyze_data(self, data_points: List[MarketData]) -> Dict[str, Any]:
+    async def analyze_data(self, batch: MarketDataBatch) -> Dict[str, Any]:
         """Analyze collected market data"""
         
-        if not data_points:
+        if not batch:
             return {"error": "No data to analyze"}
         
         # Calculate metrics
-        avg_price = sum(d.price for d in data_points) / len(data_points)
-        total_volume = sum(d.volume for d in data_points)
-        price_variance = sum((d.price - avg_price) ** 2 for d in data_points) / len(data_points)
+        prices = batch.prices
+        avg_price = statistics.fmean(prices)
+        total_volume = math.fsum(batch.volumes)
+        price_variance = math.fsum((p - avg_price) ** 2 for p in prices) / len(prices)
         
         # Sentiment from different sources
-        sources = list(set(d.source for d in data_points))
+        sources = list(dict.fromkeys(batch.sources))
         
         analysis = {
             "summary": {
-                "data_points": len(data_points),
+                "data_points": len(batch),
                 "sources": sources,
                 "avg_price": avg_price,
                 "total_volume": total_volume,
@@ -161,7 +326,7 @@ class AnalysisAgent:
                 "volatility": "high" if price_variance > 100 else "normal"
             },
             "recommendation": self._generate_recommendation(avg_price, price_variance),
-            "confidence": min(0.95, len(data_points) * 0.2)  # More data = higher confidence
+            "confidence": min(0.95, len(batch) * 0.2)  # More data = higher confidence
         }
         
         self.analyses.append(analysis)
@@ -181,7 +346,7 @@ class CoordinatorAgent:
     """Master agent that coordinates the multi-agent system"""
     
     def __init__(self, private_key: str):
-        self.llm = ChatOpenAI(model="gpt-4", temperature=0)
+        self.llm = get_llm("gpt-4", 0)
         
         # Initialize x402 client
         config = X402Config(
@@ -201,11 +366,13 @@ class CoordinatorAgent:
     async def execute_research_task(self, symbol: str, urgency: str = "normal"):
         """Execute a complete research task"""
         
-        print(f"\n{'='*60}")
-        print(f"🎯 Coordinator: Starting research task for {symbol}")
-        print(f"   Urgency: {urgency}")
-        print(f"   Budget: ${self.purchasing_agent.budget:.2f}")
-        print(f"{'='*60}\n")
+        log.info(
+            f"\n{'='*60}\n"
+            f"🎯 Coordinator: Starting research task for {symbol}\n"
+            f"   Urgency: {urgency}\n"
+            f"   Budget: ${self.purchasing_agent.budget:.2f}\n"
+            f"{'='*60}\n"
+        )
         
         # Step 1: Research sources
         market_sources = await self.research_agent.find_data_sources("market_data")
@@ -213,44 +380,51 @@ class CoordinatorAgent:
         
         all_sources = market_sources + sentiment_sources
         
-        # Step 2: Evaluate and purchase
-        purchased_data = []
+        # Step 2: Evaluate every source, then buy the approved ones as one batch
+        approved = [
+            source for source in all_sources
+            if await self.purchasing_agent.evaluate_purchase(source, urgency)
+        ]
+        results = await self.purchasing_agent.purchase_batch(approved)
         
-        for source in all_sources:
-            should_buy = await self.purchasing_agent.evaluate_purchase(source, urgency)
-            
-            if should_buy:
-                data = await self.purchasing_agent.purchase_data(source)
-                if data:
-                    # Mock data transformation
-                    market_data = MarketData(
-                        symbol=symbol,
-                        price=data.get("price", 100.0),
-                        volume=data.get("volume", 1000000),
-                        timestamp=datetime.utcnow(),
-                        source=source["name"],
-                        cost=source["cost"]
-                    )
-                    purchased_data.append(market_data)
+        # Every purchase in the batch completed by now; stamp them together
+        received_at = datetime.now(timezone.utc)
+        purchased_data = MarketDataBatch()
+        
+        for source, data in zip(approved, results):
+            if data:
+                # Mock data transformation
+                purchased_data.append(
+                    symbol=symbol,
+                    price=data.get("price", 100.0),
+                    volume=data.get("volume", 1000000),
+                    timestamp=received_at,
+                    source=source["name"],
+                    cost=source["cost"]
+                )
         
         # Step 3: Analyze
         if purchased_data:
             analysis = await self.analysis_agent.analyze_data(purchased_data)
             
-            print(f"\n📊 Analysis Complete:")
-            print(f"   Data points: {analysis['summary']['data_points']}")
-            print(f"   Average price: ${analysis['summary']['avg_price']:.2f}")
-            print(f"   Volatility: {analysis['summary']['volatility']}")
-            print(f"   Recommendation: {analysis['recommendation']}")
-            print(f"   Confidence: {analysis['confidence']:.1%}")
+            log.info(
+                f"\n📊 Analysis Complete:\n"
+                f"   Data points: {analysis['summary']['data_points']}\n"
+                f"   Average price: ${analysis['summary']['avg_price']:.2f}\n"
+                f"   Volatility: {analysis['summary']['volatility']}\n"
+                f"   Recommendation: {analysis['recommendation']}\n"
+                f"   Confidence: {analysis['confidence']:.1%}"
+            )
         else:
-            print("\n❌ No data purchased - unable to analyze")
+            log.info("\n❌ No data purchased - unable to analyze")
         
         # Summary
-        print(f"\n💰 Financial Summary:")
-        print(f"   Total spent: ${self.purchasing_agent.spent:.2f}")
-        print(f"   Remaining budget: ${self.purchasing_agent.budget - self.purchasing_agent.spent:.2f}")
-        print(f"   Purchases made: {len(self.purchasing_agent.purchases)}")
+        log.info(
+            f"\n💰 Financial Summary:\n"
+            f"   Total spent: ${self.purchasing_agent.spent:.2f}\n"
+            f"   Remaining budget: ${self.purchasing_agent.budget - self.purchasing_agent.spent:.2f}\n"
+            f"   Purchases made: {len(self.purchasing_agent.purchases)}"
+        )
         
         return {
             "symbol": symbol,
@@ -276,13 +450,19 @@ async def main():
         ("TSLA", "low"),     # Low urgency - only cheapest/best sources
     ]
     
-    for symbol, urgency in tasks:
-        result = await coordinator.execute_research_task(symbol, urgency)
-        await asyncio.sleep(2)  # Pause between tasks
+    # One connection pool for every purchase across all tasks
+    async with coordinator.purchasing_agent.client:
+        for symbol, urgency in tasks:
+            result = await coordinator.execute_research_task(symbol, urgency)
+            await asyncio.sleep(2)  # Pause between tasks
+    
+    cache_stats = coordinator.purchasing_agent.get_tool_cache_stats()
     
-    print(f"\n{'='*60}")
-    print("🏁 Multi-Agent System Complete!")
-    print(f"{'='*60}")
+    log.info(f"\n{'='*60}")
+    log.info("🏁 Multi-Agent System Complete!")
+    log.info(f"   Cache hits: {cache_stats['hits']} / {cache_stats['hits'] + cache_stats['misses']}")
+    log.info(f"   Saved by cache: ${cache_stats['dollars_saved']:.2f}")
+    log.info(f"{'='*60}")
 
 
 if __name__ == "__main__":
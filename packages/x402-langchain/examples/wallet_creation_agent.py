@@ -2,15 +2,19 @@
 
 import os
 import asyncio
-from x402_langchain import X402Client, X402Config, SpendingLimits
+from x402_langchain import X402Client, X402Config, SpendingLimits, SpendingStore
+
+from _log import get_logger
+
+log = get_logger(__name__)
 
 
 async def main():
-    print("🤖 X402 Agent Wallet Creation Example")
-    print("="*50)
+    log.info("🤖 X402 Agent Wallet Creation Example")
+    log.info("="*50)
     
     # Method 1: Auto-create wallet (no private key provided)
-    print("\n1. Auto-creating agent wallet:")
+    log.info("\n1. Auto-creating agent wallet:")
     config1 = X402Config(
         # No private_key provided - will create new wallet
         spending_limits=SpendingLimits(
@@ -23,26 +27,26 @@ async def main():
     
     try:
         client1 = X402Client(config1)
-        print(f"   Agent wallet: {client1.config.wallet_address}")
+        log.info(f"   Agent wallet: {client1.config.wallet_address}")
         
         # Export wallet (without private key)
         wallet_info = client1.export_wallet(include_private_key=False)
-        print(f"   Exported info: {wallet_info}")
+        log.info(f"   Exported info: {wallet_info}")
         
         # Get analytics
         analytics = client1.get_shared_analytics()
         if analytics:
-            print(f"   Wallet analytics: {analytics}")
+            log.info(f"   Wallet analytics: {analytics}")
     except Exception as e:
-        print(f"   Note: {e}")
-        print("   Install required packages: pip install mnemonic eth-account")
+        log.info(f"   Note: {e}")
+        log.info("   Install required packages: pip install mnemonic eth-account")
     
     # Method 2: Create additional wallet
-    print("\n2. Creating additional agent wallet:")
+    log.info("\n2. Creating additional agent wallet:")
     try:
         address, private_key = client1.create_wallet("research_agent")
-        print(f"   New wallet address: {address}")
-        print(f"   Private key: {private_key[:10]}...{private_key[-10:]}")
+        log.info(f"   New wallet address: {address}")
+        log.info(f"   Private key: {private_key[:10]}...{private_key[-10:]}")
         
         # Create client with the new wallet
         config2 = X402Config(
@@ -54,14 +58,35 @@ async def main():
             ),
             auto_approve=True,
         )
-        client2 = X402Client(config2)
-        print(f"   Research agent initialized with wallet: {client2.config.wallet_address}")
+        # Every client for this wallet shares one set of spending counters
+        research_spending = SpendingStore()
+        client2 = X402Client(config2, spending_store=research_spending)
+        log.info(f"   Research agent initialized with wallet: {client2.config.wallet_address}")
+        worker = X402Client(config2, spending_store=research_spending)
+        log.info(f"   Worker client shares its spending: {worker.spending is client2.spending}")
+        
+        # Agents that fan out many paid requests can size the HTTP pool and
+        # the number of fetches in flight
+        config_busy = X402Config(
+            private_key=private_key,
+            spending_limits=SpendingLimits(
+                per_request=0.05,
+                per_hour=0.50,
+                per_day=2.00
+            ),
+            auto_approve=True,
+            max_connections=64,
+            max_keepalive_connections=32,
+            request_concurrency=16,
+        )
+        log.info(f"   High-throughput config: {config_busy.request_concurrency} concurrent requests, "
+                 f"{config_busy.max_connections} connections")
         
     except Exception as e:
-        print(f"   Error: {e}")
+        log.info(f"   Error: {e}")
     
     # Method 3: Using environment variable
-    print("\n3. Using wallet from environment:")
+    log.info("\n3. Using wallet from environment:")
     if os.getenv("AGENT_PRIVATE_KEY"):
         config3 = X402Config(
             private_key=os.getenv("AGENT_PRIVATE_KEY"),
@@ -73,42 +98,42 @@ async def main():
             auto_approve=True,
         )
         client3 = X402Client(config3)
-        print(f"   Production agent wallet: {client3.config.wallet_address}")
+        log.info(f"   Production agent wallet: {client3.config.wallet_address}")
     else:
-        print("   No AGENT_PRIVATE_KEY environment variable set")
+        log.info("   No AGENT_PRIVATE_KEY environment variable set")
     
     # Demo spending status
-    print("\n4. Checking spending status:")
+    log.info("\n4. Checking spending status:")
     if 'client1' in locals():
         status = client1.get_spending_status()
-        print(f"   Wallet: {status['wallet_address']}")
-        print(f"   Daily limit: ${status['limits']['per_day']}")
-        print(f"   Spent today: ${status['spent_today']}")
-        print(f"   Remaining today: ${status['remaining']['day']}")
+        log.info(f"   Wallet: {status['wallet_address']}")
+        log.info(f"   Daily limit: ${status['limits']['per_day']}")
+        log.info(f"   Spent today: ${status['spent_today']}")
+        log.info(f"   Remaining today: ${status['remaining']['day']}")
     
     # Demo payment simulation
-    print("\n5. Simulating payment flow:")
+    log.info("\n5. Simulating payment flow:")
     if 'client1' in locals():
-        print("   Making a test request to a free endpoint...")
+        log.info("   Making a test request to a free endpoint...")
         try:
             result = await client1.fetch_with_payment(
                 url="https://api.example.com/free",
                 max_amount=0.10
             )
-            print(f"   Result: {'Success' if result.success else 'Failed'}")
-            print(f"   Cost: ${result.amount}")
+            log.info(f"   Result: {'Success' if result.success else 'Failed'}")
+            log.info(f"   Cost: ${result.amount}")
         except Exception as e:
-            print(f"   Request failed: {e}")
+            log.info(f"   Request failed: {e}")
     
-    print("\n✅ Agent wallet creation example complete!")
+    log.info("\n✅ Agent wallet creation example complete!")
     
     # Best practices
-    print("\n📚 Best Practices:")
-    print("1. Store private keys securely (use environment variables or secret managers)")
-    print("2. Set appropriate spending limits for each agent")
-    print("3. Use separate wallets for different agent purposes")
-    print("4. Monitor wallet balances and top up as needed")
-    print("5. Export and backup wallet mnemonics securely")
+    log.info("\n📚 Best Practices:")
+    log.info("1. Store private keys securely (use environment variables or secret managers)")
+    log.info("2. Set appropriate spending limits for each agent")
+    log.info("3. Use separate wallets for different agent purposes")
+    log.info("4. Monitor wallet balances and top up as needed")
+    log.info("5. Export and backup wallet mnemonics securely")
 
 
 if __name__ == "__main__":
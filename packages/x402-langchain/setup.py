@@ -53,6 +53,7 @@ setup(
         "pydantic>=2.0.0",
         "aiohttp>=3.8.0",
         "mnemonic>=0.20",
+        "pycryptodome>=3.6.6",
     ],
     extras_require={
         "dev": [
@@ -64,6 +65,10 @@ setup(
             "mypy>=1.5.0",
             "langchain-openai>=0.0.5",
         ],
+        "fast": [
+            "orjson>=3.9.0",
+            "httpx[http2]>=0.24.0",
+        ],
     },
     keywords=[
         "x402",
@@ -6,7 +6,7 @@ import time
 from unittest.mock import Mock, patch, AsyncMock
 import httpx
 
-from x402_langchain import X402Client, X402Config
+from x402_langchain import X402Client, X402Config, SpendingStore
 from x402_langchain.models import PaymentRequirement, PaymentResult
 from x402_langchain.exceptions import (
     SpendingLimitError,
@@ -181,6 +181,36 @@ class TestX402Client:
         assert status["remaining"]["hour"] == 9.25  # 10.0 - 0.75
         assert status["remaining"]["day"] == 99.25  # 100.0 - 0.75
     
+    @pytest.mark.asyncio
+    async def test_fetch_many(self, client, payment_requirement):
+        """Test fetch_many pays for several URLs and keeps result order"""
+        payment_requirement.amount = "0.25"
+        
+        mock_402 = Mock()
+        mock_402.status_code = 402
+        mock_402.json.return_value = payment_requirement.model_dump(by_alias=True)
+        
+        def respond(method, url, **kwargs):
+            if "X-Payment" not in kwargs.get("headers", {}):
+                return mock_402
+            mock_200 = Mock()
+            mock_200.status_code = 200
+            mock_200.headers = {"content-type": "application/json"}
+            mock_200.json.return_value = {"url": url}
+            return mock_200
+        
+        urls = [f"https://api.test.com/data{i}" for i in range(3)]
+        with patch.object(httpx.AsyncClient, "request", side_effect=respond):
+            results = await client.fetch_many(urls + ["https://bad.com/data"])
+        
+        assert [result.data for result in results[:3]] == [{"url": url} for url in urls]
+        assert isinstance(results[3], DomainNotAllowedError)
+        
+        status = client.get_spending_status()
+        assert status["spent_hour"] == 0.75  # 3 * 0.25
+        assert status["request_count"] == 3
+        assert client.spending.reserved == 0.0
+    
     @pytest.mark.asyncio
     async def test_custom_approval_callback(self, payment_requirement):
         """Test custom approval callback"""
@@ -226,6 +256,51 @@ class TestX402Client:
             with pytest.raises(PaymentDeniedError):
                 await client.fetch_with_payment("https://api.test.com/expensive")
     
+    @pytest.mark.asyncio
+    async def test_batch_approval_callback(self):
+        """Test approvals inside batch() reach the batch callback in one call"""
+        batches = []
+        
+        async def approve_batch(requests):
+            batches.append(requests)
+            return [amount < 0.30 for _, amount in requests]
+        
+        config = X402Config(
+            private_key="0x1234567890abcdef1234567890abcdef1234567890abcdef1234567890abcdef",
+            auto_approve=False,
+            approval_callback_batch=approve_batch,
+        )
+        client = X402Client(config)
+        
+        async with client.batch():
+            approvals = await asyncio.gather(
+                client._get_approval("https://api.test.com/cheap", 0.25),
+                client._get_approval("https://api.test.com/expensive", 0.50),
+            )
+        
+        assert approvals == [True, False]
+        assert batches == [[
+            ("https://api.test.com/cheap", 0.25),
+            ("https://api.test.com/expensive", 0.50),
+        ]]
+    
+    def test_shared_spending_store(self, config):
+        """Test clients sharing a store enforce one set of limits per wallet"""
+        store = SpendingStore()
+        client1 = X402Client(config, spending_store=store)
+        client2 = X402Client(config, spending_store=store)
+        
+        client1._update_spending(6.0)
+        client2._update_spending(3.5)
+        
+        assert client1.get_spending_status()["spent_hour"] == 9.5
+        assert client2.spent_today == 9.5
+        assert not client2._check_spending_limits(0.75)  # per_hour is 10.0
+        assert store.snapshot()[client1.account.address]["request_count"] == 2
+        
+        # Clients without a shared store keep their own counters
+        assert X402Client(config).spent_today == 0.0
+    
     @pytest.mark.asyncio
     async def test_payment_logging(self, client, payment_requirement):
         """Test payment logging"""
@@ -1,8 +1,9 @@
 """x402-langchain: Enable autonomous AI agent payments"""
 
-from .tools import X402PaymentTool, create_x402_tool
-from .agent import X402Agent, create_x402_agent
-from .client import X402Client
+import importlib
+from typing import Any
+
+from .client import X402Client, SpendingStore
 from .config import X402Config, SpendingLimits
 from .exceptions import X402Error, PaymentError, InsufficientFundsError
 
@@ -22,6 +23,7 @@ __all__ = [
     "X402Agent",
     "create_x402_agent",
     "X402Client",
+    "SpendingStore",
     "X402Config",
     "SpendingLimits",
     "X402Error",
@@ -29,6 +31,24 @@ __all__ = [
     "InsufficientFundsError",
 ]
 
+# LangChain integrations are imported on first use, so code that only
+# needs X402Client doesn't pay langchain's import time
+_LAZY_EXPORTS = {
+    "X402PaymentTool": ".tools",
+    "create_x402_tool": ".tools",
+    "X402Agent": ".agent",
+    "create_x402_agent": ".agent",
+}
+
+
+def __getattr__(name: str) -> Any:
+    module = _LAZY_EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
 # Add enhanced exports if available
 if _enhanced_available:
     __all__.extend([
@@ -1,8 +1,11 @@
 """x402 client for making payments"""
 
 import asyncio
+import importlib.util
 import time
-from typing import Dict, Optional, Any, Union
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import AsyncIterator, Dict, List, Optional, Any, Tuple, Union
 from urllib.parse import urlparse
 import re
 
@@ -24,26 +27,174 @@ from .exceptions import (
 from .logger import logger
 
 
+class _ApprovalBatch:
+    """Approval requests collected inside X402Client.batch()"""
+    
+    def __init__(self, window: float):
+        self.window = window
+        self.pending: List[Tuple[str, float, "asyncio.Future[bool]"]] = []
+        self.flush_task: Optional[asyncio.Task] = None
+
+
+# Batch that approvals requested in the current context are added to
+_current_batch: ContextVar[Optional[_ApprovalBatch]] = ContextVar(
+    "x402_approval_batch", default=None
+)
+
+
+class WalletSpending:
+    """Spending counters for one wallet"""
+    
+    __slots__ = (
+        "spent_today",
+        "spent_hour",
+        "last_hour_reset",
+        "last_day_reset",
+        "request_count",
+        "total_paid",
+        "reserved",
+    )
+    
+    def __init__(self):
+        self.spent_today = 0.0
+        self.spent_hour = 0.0
+        self.last_hour_reset = time.time()
+        self.last_day_reset = time.time()
+        # Lifetime totals over successful paid requests
+        self.request_count = 0
+        self.total_paid = 0.0
+        # Amount of payments approved but not yet settled
+        self.reserved = 0.0
+
+
+class SpendingStore:
+    """Spending counters for any number of wallets
+    
+    Clients given the same store share one set of counters per wallet, so
+    several X402Client instances for one wallet enforce a single set of
+    spending limits. Counters are only updated synchronously on the event
+    loop, so no lock is needed.
+    """
+    
+    def __init__(self):
+        self._wallets: Dict[str, WalletSpending] = {}
+    
+    def wallet(self, address: str) -> WalletSpending:
+        """Return the counters for a wallet, creating them if needed"""
+        spending = self._wallets.get(address)
+        if spending is None:
+            spending = self._wallets[address] = WalletSpending()
+        return spending
+    
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """Spending totals for every wallet in the store"""
+        return {
+            address: {
+                "spent_today": spending.spent_today,
+                "spent_hour": spending.spent_hour,
+                "request_count": spending.request_count,
+                "total_paid": spending.total_paid,
+            }
+            for address, spending in self._wallets.items()
+        }
+
+
 class X402Client:
     """Client for making x402 payments"""
     
-    def __init__(self, config: X402Config):
+    def __init__(self, config: X402Config, spending_store: Optional[SpendingStore] = None):
         self.config = config
         self.account = Account.from_key(config.private_key)
         self.config.wallet_address = self.account.address
-        self.spent_today = 0.0
-        self.spent_hour = 0.0
-        self.last_hour_reset = time.time()
-        self.last_day_reset = time.time()
+        # Pass a shared store to pool spending with other clients for this wallet
+        self.spending_store = spending_store or SpendingStore()
+        self.spending = self.spending_store.wallet(self.account.address)
+        self._http: Optional[httpx.AsyncClient] = None
+        # Created on first use so it binds to the running event loop
+        self._request_slots: Optional[asyncio.Semaphore] = None
+    
+    @property
+    def spent_today(self) -> float:
+        return self.spending.spent_today
+    
+    @spent_today.setter
+    def spent_today(self, value: float):
+        self.spending.spent_today = value
+    
+    @property
+    def spent_hour(self) -> float:
+        return self.spending.spent_hour
+    
+    @spent_hour.setter
+    def spent_hour(self, value: float):
+        self.spending.spent_hour = value
+    
+    @property
+    def request_count(self) -> int:
+        return self.spending.request_count
+    
+    @property
+    def total_paid(self) -> float:
+        return self.spending.total_paid
+    
+    def _get_http(self) -> httpx.AsyncClient:
+        """Return the client's pooled HTTP client, creating it if needed
         
+        Reusing one client keeps TCP/TLS connections to API hosts alive
+        between payments instead of reconnecting for every fetch.
+        """
+        if self._http is None or self._http.is_closed:
+            self._http = httpx.AsyncClient(
+                timeout=self.config.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.config.max_connections,
+                    max_keepalive_connections=self.config.max_keepalive_connections,
+                    keepalive_expiry=75.0,
+                ),
+                # Concurrent fetches to one host share a single connection
+                http2=self.config.http2 and importlib.util.find_spec("h2") is not None,
+            )
+        return self._http
+    
+    async def aclose(self):
+        """Close the pooled HTTP client"""
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+    
+    async def __aenter__(self) -> "X402Client":
+        self._get_http()
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.aclose()
+    
     async def fetch_with_payment(
         self,
         url: str,
-        max_amount: float = None,
+        max_amount: Optional[float] = None,
         method: str = "GET",
         **kwargs
     ) -> PaymentResult:
-        """Fetch a URL, automatically handling x402 payments"""
+        """Fetch a URL, automatically handling x402 payments
+        
+        At most config.request_concurrency fetches run at once; further
+        calls wait for a slot instead of queueing inside the HTTP pool.
+        """
+        if self._request_slots is None:
+            self._request_slots = asyncio.Semaphore(self.config.request_concurrency)
+        
+        async with self._request_slots:
+            return await self._fetch_with_payment(url, max_amount, method, **kwargs)
+    
+    async def _fetch_with_payment(
+        self,
+        url: str,
+        max_amount: Optional[float],
+        method: str,
+        **kwargs
+    ) -> PaymentResult:
+        """Fetch a URL and pay for it if the server responds with 402"""
         
         # Check domain restrictions
         domain = urlparse(url).netloc
@@ -53,87 +204,107 @@ class X402Client:
             raise DomainNotAllowedError(f"Domain {domain} is blocked")
         
         # First request without payment
-        async with httpx.AsyncClient(timeout=self.config.timeout) as client:
-            response = await client.request(method, url, **kwargs)
+        client = self._get_http()
+        response = await client.request(method, url, **kwargs)
+        
+        # If not 402, return the response
+        if response.status_code != 402:
+            return PaymentResult(
+                success=True,
+                url=url,
+                amount="0",
+                token="",
+                data=response.json() if response.headers.get("content-type", "").startswith("application/json") else response.text,
+            )
+        
+        # Parse payment requirement
+        try:
+            requirement = PaymentRequirement(**response.json())
+        except Exception as e:
+            raise InvalidPaymentRequirementError(f"Invalid payment requirement: {e}")
+        
+        # Check amount limits
+        amount = float(requirement.amount)
+        if max_amount and amount > max_amount:
+            raise SpendingLimitError(f"Required amount {amount} exceeds max {max_amount}")
+        
+        # Check spending limits
+        if not self._check_spending_limits(amount):
+            if self.analytics and AnalyticsEvent:
+                asyncio.create_task(self.analytics.track_event(
+                    AnalyticsEvent.SPENDING_LIMIT_REACHED,
+                    wallet_address=self.account.address,
+                    amount=amount,
+                    metadata={"url": url}
+                ))
+            raise SpendingLimitError(f"Payment would exceed spending limits")
+        
+        # Hold the amount against the limits until this payment settles, so
+        # concurrent fetches can't all pass the check and overspend. There is
+        # no await between the check and the reservation.
+        self.spending.reserved += amount
+        try:
+            return await self._pay_and_fetch(url, method, amount, requirement, **kwargs)
+        finally:
+            self.spending.reserved -= amount
+    
+    async def _pay_and_fetch(
+        self,
+        url: str,
+        method: str,
+        amount: float,
+        requirement: PaymentRequirement,
+        **kwargs
+    ) -> PaymentResult:
+        """Approve and sign a payment, then repeat the request with it"""
+        
+        # Get approval if needed
+        if not await self._get_approval(url, amount):
+            raise PaymentDeniedError(f"Payment denied for {url}")
+        
+        # Create and sign payment
+        payment_auth = self._create_payment_authorization(requirement)
+        
+        # Retry with payment
+        # Copy so concurrent fetches sharing one headers dict don't clash
+        headers = dict(kwargs.get("headers") or {})
+        headers["X-Payment"] = payment_auth.to_header()
+        kwargs["headers"] = headers
+        
+        try:
+            payment_response = await self._get_http().request(method, url, **kwargs)
             
-            # If not 402, return the response
-            if response.status_code != 402:
+            if payment_response.status_code == 200:
+                # Update spending tracking
+                self._update_spending(amount)
+                
+                # Log payment if enabled
+                if self.config.log_payments:
+                    await self._log_payment(url, amount, requirement.token, True)
+                
                 return PaymentResult(
                     success=True,
                     url=url,
-                    amount="0",
-                    token="",
-                    data=response.json() if response.headers.get("content-type", "").startswith("application/json") else response.text,
+                    amount=requirement.amount,
+                    token=requirement.token,
+                    transaction_hash=payment_response.headers.get("X-Payment-Confirmation"),
+                    data=payment_response.json() if payment_response.headers.get("content-type", "").startswith("application/json") else payment_response.text,
+                )
+            else:
+                error = f"Payment failed: {payment_response.status_code} {payment_response.text}"
+                if self.config.log_payments:
+                    await self._log_payment(url, amount, requirement.token, False, error)
+                
+                return PaymentResult(
+                    success=False,
+                    url=url,
+                    amount=requirement.amount,
+                    token=requirement.token,
+                    error=error,
                 )
-            
-            # Parse payment requirement
-            try:
-                requirement = PaymentRequirement(**response.json())
-            except Exception as e:
-                raise InvalidPaymentRequirementError(f"Invalid payment requirement: {e}")
-            
-            # Check amount limits
-            amount = float(requirement.amount)
-            if max_amount and amount > max_amount:
-                raise SpendingLimitError(f"Required amount {amount} exceeds max {max_amount}")
-            
-            # Check spending limits
-            if not self._check_spending_limits(amount):
-                if self.analytics and AnalyticsEvent:
-                    asyncio.create_task(self.analytics.track_event(
-                        AnalyticsEvent.SPENDING_LIMIT_REACHED,
-                        wallet_address=self.account.address,
-                        amount=amount,
-                        metadata={"url": url}
-                    ))
-                raise SpendingLimitError(f"Payment would exceed spending limits")
-            
-            # Get approval if needed
-            if not await self._get_approval(url, amount):
-                raise PaymentDeniedError(f"Payment denied for {url}")
-            
-            # Create and sign payment
-            payment_auth = self._create_payment_authorization(requirement)
-            
-            # Retry with payment
-            headers = kwargs.get("headers", {})
-            headers["X-Payment"] = payment_auth.to_header()
-            kwargs["headers"] = headers
-            
-            try:
-                payment_response = await client.request(method, url, **kwargs)
                 
-                if payment_response.status_code == 200:
-                    # Update spending tracking
-                    self._update_spending(amount)
-                    
-                    # Log payment if enabled
-                    if self.config.log_payments:
-                        await self._log_payment(url, amount, requirement.token, True)
-                    
-                    return PaymentResult(
-                        success=True,
-                        url=url,
-                        amount=requirement.amount,
-                        token=requirement.token,
-                        transaction_hash=payment_response.headers.get("X-Payment-Confirmation"),
-                        data=payment_response.json() if payment_response.headers.get("content-type", "").startswith("application/json") else payment_response.text,
-                    )
-                else:
-                    error = f"Payment failed: {payment_response.status_code} {payment_response.text}"
-                    if self.config.log_payments:
-                        await self._log_payment(url, amount, requirement.token, False, error)
-                    
-                    return PaymentResult(
-                        success=False,
-                        url=url,
-                        amount=requirement.amount,
-                        token=requirement.token,
-                        error=error,
-                    )
-                    
-            except httpx.TimeoutException:
-                raise PaymentTimeoutError(f"Payment request timed out for {url}")
+        except httpx.TimeoutException:
+            raise PaymentTimeoutError(f"Payment request timed out for {url}")
     
     def _create_payment_authorization(self, requirement: PaymentRequirement) -> PaymentAuthorization:
         """Create and sign payment authorization"""
@@ -175,7 +346,7 @@ class X402Client:
         }
         
         # Sign the message
-        encoded_message = encode_typed_data(message)
+        encoded_message = encode_typed_data(full_message=message)
         signed = self.account.sign_message(encoded_message)
         
         return PaymentAuthorization(
@@ -192,14 +363,16 @@ class X402Client:
     def _check_spending_limits(self, amount: float) -> bool:
         """Check if payment is within spending limits"""
         
+        spending = self.spending
+        
         # Reset hourly/daily counters if needed
         current_time = time.time()
-        if current_time - self.last_hour_reset > 3600:
-            self.spent_hour = 0.0
-            self.last_hour_reset = current_time
-        if current_time - self.last_day_reset > 86400:
-            self.spent_today = 0.0
-            self.last_day_reset = current_time
+        if current_time - spending.last_hour_reset > 3600:
+            spending.spent_hour = 0.0
+            spending.last_hour_reset = current_time
+        if current_time - spending.last_day_reset > 86400:
+            spending.spent_today = 0.0
+            spending.last_day_reset = current_time
         
         limits = self.config.spending_limits
         
@@ -207,16 +380,61 @@ class X402Client:
         if amount > limits.per_request:
             return False
         
+        # Payments still in flight count against the limits too
+        amount += spending.reserved
+        
         # Check hourly limit
-        if self.spent_hour + amount > limits.per_hour:
+        if spending.spent_hour + amount > limits.per_hour:
             return False
         
         # Check daily limit
-        if self.spent_today + amount > limits.per_day:
+        if spending.spent_today + amount > limits.per_day:
             return False
         
         return True
     
+    async def fetch_many(
+        self,
+        urls: List[str],
+        max_amount: Optional[float] = None,
+        method: str = "GET",
+        concurrency: int = 10,
+        **kwargs
+    ) -> List[Union[PaymentResult, Exception]]:
+        """Fetch several URLs concurrently, paying for each as needed
+        
+        Results are in the same order as urls. A fetch that raises, e.g.
+        SpendingLimitError, gives its exception in place of a result instead
+        of cancelling the others. Approvals are requested as one batch.
+        """
+        sem = asyncio.Semaphore(concurrency)
+        
+        async def fetch_one(url: str) -> PaymentResult:
+            async with sem:
+                return await self.fetch_with_payment(url, max_amount, method, **kwargs)
+        
+        async with self.batch():
+            return await asyncio.gather(
+                *(fetch_one(url) for url in urls),
+                return_exceptions=True,
+            )
+    
+    @asynccontextmanager
+    async def batch(self, window: float = 0.01) -> AsyncIterator["X402Client"]:
+        """Group the payment approvals requested inside the block
+        
+        Approvals arriving within window seconds of each other are decided
+        by one call to config.approval_callback_batch, or by the per-payment
+        callback run concurrently if no batch callback is set. Wrap an
+        asyncio.gather of fetch_with_payment calls to ask the approver once
+        per fan-out.
+        """
+        token = _current_batch.set(_ApprovalBatch(window))
+        try:
+            yield self
+        finally:
+            _current_batch.reset(token)
+    
     async def _get_approval(self, url: str, amount: float) -> bool:
         """Get approval for payment"""
         
@@ -224,6 +442,52 @@ class X402Client:
         if self.config.auto_approve:
             return True
         
+        batch = _current_batch.get()
+        if batch is not None:
+            future = asyncio.get_running_loop().create_future()
+            batch.pending.append((url, amount, future))
+            if batch.flush_task is None:
+                batch.flush_task = asyncio.create_task(self._flush_approvals(batch))
+            return await future
+        
+        return await self._approve_one(url, amount)
+    
+    async def _flush_approvals(self, batch: _ApprovalBatch):
+        """Decide every approval collected in a batch window at once"""
+        
+        await asyncio.sleep(batch.window)
+        pending, batch.pending = batch.pending, []
+        # Requests arriving from here on start the next window
+        batch.flush_task = None
+        
+        requests = [(url, amount) for url, amount, _ in pending]
+        try:
+            callback = self.config.approval_callback_batch
+            if callback is None:
+                approvals = await asyncio.gather(
+                    *(self._approve_one(url, amount) for url, amount in requests)
+                )
+            elif asyncio.iscoroutinefunction(callback):
+                approvals = await callback(requests)
+            else:
+                approvals = callback(requests)
+            if len(approvals) != len(requests):
+                raise PaymentError(
+                    f"Batch approval returned {len(approvals)} results for {len(requests)} payments"
+                )
+        except Exception as e:
+            for _, _, future in pending:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        
+        for (_, _, future), approved in zip(pending, approvals):
+            if not future.done():
+                future.set_result(bool(approved))
+    
+    async def _approve_one(self, url: str, amount: float) -> bool:
+        """Ask the per-payment approval callback about one payment"""
+        
         # Use approval callback if provided
         if self.config.approval_callback:
             if asyncio.iscoroutinefunction(self.config.approval_callback):
@@ -236,8 +500,11 @@ class X402Client:
     
     def _update_spending(self, amount: float):
         """Update spending trackers"""
-        self.spent_hour += amount
-        self.spent_today += amount
+        spending = self.spending
+        spending.spent_hour += amount
+        spending.spent_today += amount
+        spending.request_count += 1
+        spending.total_paid += amount
     
     async def _log_payment(
         self, 
@@ -254,37 +521,39 @@ class X402Client:
         # Send webhook if configured
         if self.config.webhook_url:
             try:
-                async with httpx.AsyncClient() as client:
-                    await client.post(
-                        self.config.webhook_url,
-                        json={
-                            "type": "payment_attempt",
-                            "url": url,
-                            "amount": amount,
-                            "token": token,
-                            "success": success,
-                            "error": error,
-                            "wallet": self.account.address,
-                            "timestamp": time.time(),
-                        },
-                        timeout=5.0,
-                    )
+                await self._get_http().post(
+                    self.config.webhook_url,
+                    json={
+                        "type": "payment_attempt",
+                        "url": url,
+                        "amount": amount,
+                        "token": token,
+                        "success": success,
+                        "error": error,
+                        "wallet": self.account.address,
+                        "timestamp": time.time(),
+                    },
+                    timeout=5.0,
+                )
             except:
                 pass  # Don't fail on webhook errors
     
     def get_spending_status(self) -> Dict[str, Any]:
         """Get current spending status"""
+        spending = self.spending
         return {
             "wallet_address": self.account.address,
-            "spent_today": self.spent_today,
-            "spent_hour": self.spent_hour,
+            "spent_today": spending.spent_today,
+            "spent_hour": spending.spent_hour,
+            "request_count": spending.request_count,
+            "avg_cost": spending.total_paid / spending.request_count if spending.request_count else 0.0,
             "limits": {
                 "per_request": self.config.spending_limits.per_request,
                 "per_hour": self.config.spending_limits.per_hour,
                 "per_day": self.config.spending_limits.per_day,
             },
             "remaining": {
-                "hour": self.config.spending_limits.per_hour - self.spent_hour,
-                "day": self.config.spending_limits.per_day - self.spent_today,
+                "hour": self.config.spending_limits.per_hour - spending.spent_hour,
+                "day": self.config.spending_limits.per_day - spending.spent_today,
             },
         }
\ No newline at end of file
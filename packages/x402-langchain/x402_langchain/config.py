@@ -42,8 +42,19 @@ class X402Config(BaseModel):
     # Behavior configuration
     auto_approve: bool = Field(default=False, description="Auto-approve payments within limits")
     approval_callback: Optional[Any] = Field(None, description="Callback for payment approval")
+    approval_callback_batch: Optional[Any] = Field(
+        None,
+        description="Callback approving a list of (url, amount) pairs at once, used inside X402Client.batch()"
+    )
     max_retries: int = Field(default=3, description="Max retries for failed payments")
     timeout: float = Field(default=30.0, description="Request timeout in seconds")
+    http2: bool = Field(
+        default=True,
+        description="Multiplex concurrent requests to a host over HTTP/2 (needs the h2 package)"
+    )
+    max_connections: int = Field(default=64, description="Max open HTTP connections across all hosts")
+    max_keepalive_connections: int = Field(default=32, description="Max idle connections kept open for reuse")
+    request_concurrency: int = Field(default=16, description="Max fetch_with_payment calls in flight at once")
     
     # Monitoring
     log_payments: bool = Field(default=True, description="Log all payment attempts")
@@ -1,8 +1,11 @@
 """Shared analytics backend for x402 SDKs"""
 
+import os
 import time
 import json
+import heapq
 import asyncio
+from operator import itemgetter
 from typing import Dict, Any, Optional, List
 from datetime import datetime, timedelta
 from collections import defaultdict
@@ -19,7 +22,13 @@ class AnalyticsEvent(str, Enum):
     SPENDING_LIMIT_REACHED = "spending_limit_reached"
     API_CALL = "api_call"
     FACILITATOR_VERIFICATION = "facilitator_verification"
-    
+
+
+_PAYMENT_COMPLETED = AnalyticsEvent.PAYMENT_COMPLETED.value
+_PAYMENT_FAILED = AnalyticsEvent.PAYMENT_FAILED.value
+_API_CALL = AnalyticsEvent.API_CALL.value
+_FACILITATOR_VERIFICATION = AnalyticsEvent.FACILITATOR_VERIFICATION.value
+
 
 class AnalyticsBackend:
     """Centralized analytics for tracking usage and monetization"""
@@ -28,24 +37,29 @@ class AnalyticsBackend:
                  api_key: Optional[str] = None,
                  endpoint: Optional[str] = None,
                  batch_size: int = 100,
-                 flush_interval: int = 60):
+                 flush_interval: int = 60,
+                 snapshot_path: Optional[str] = None,
+                 snapshot_interval: int = 300):
         
         self.api_key = api_key
         self.endpoint = endpoint or "https://analytics.x402.io/v1/events"
         self.batch_size = batch_size
         self.flush_interval = flush_interval
         
-        # In-memory storage
+        # Optional on-disk snapshot of metrics for warm restarts
+        self._snapshot_path = snapshot_path
+        self.snapshot_interval = snapshot_interval
+        
+        # In-memory storage. Unique wallets/providers are the keys of the
+        # revenue dicts, so no separate sets are kept for them.
         self.events_queue: List[Dict[str, Any]] = []
         self.metrics = {
             "total_payments": 0,
             "total_revenue": 0.0,
             "failed_payments": 0,
-            "unique_wallets": set(),
-            "unique_providers": set(),
             "revenue_by_provider": defaultdict(float),
             "revenue_by_wallet": defaultdict(float),
-            "payments_by_hour": defaultdict(int),
+            "payments_by_hour": [0] * 24,  # indexed by hour of day
             "api_calls_by_endpoint": defaultdict(int),
         }
         
@@ -59,16 +73,27 @@ class AnalyticsBackend:
         
         # Start background task for flushing events
         self._flush_task = None
+        self._snapshot_task = None
+        
+        # Flush started by enqueue_event when a batch fills up
+        self._pending_flush: Optional[asyncio.Task] = None
         
     async def start(self):
         """Start the analytics backend"""
+        if self._snapshot_path:
+            self.load_snapshot()
+            self._snapshot_task = asyncio.create_task(self._periodic_snapshot())
         self._flush_task = asyncio.create_task(self._periodic_flush())
         
     async def stop(self):
         """Stop the analytics backend and flush remaining events"""
         if self._flush_task:
             self._flush_task.cancel()
+        if self._snapshot_task:
+            self._snapshot_task.cancel()
         await self.flush()
+        if self._snapshot_path:
+            self.save_snapshot()
         
     async def track_event(self, 
                          event_type: AnalyticsEvent,
@@ -78,6 +103,43 @@ class AnalyticsBackend:
                          metadata: Optional[Dict[str, Any]] = None):
         """Track an analytics event"""
         
+        self._record_event(event_type, wallet_address, provider_address, amount, metadata)
+        
+        # Check if we should flush
+        if len(self.events_queue) >= self.batch_size:
+            await self.flush()
+    
+    def enqueue_event(self,
+                      event_type: AnalyticsEvent,
+                      wallet_address: Optional[str] = None,
+                      provider_address: Optional[str] = None,
+                      amount: Optional[float] = None,
+                      metadata: Optional[Dict[str, Any]] = None):
+        """Track an event without waiting on the network
+        
+        Metrics update immediately; a full batch is flushed in the background.
+        """
+        
+        self._record_event(event_type, wallet_address, provider_address, amount, metadata)
+        
+        if len(self.events_queue) < self.batch_size:
+            return
+        if self._pending_flush is not None and not self._pending_flush.done():
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return  # no loop: left for the periodic flush or stop()
+        self._pending_flush = loop.create_task(self.flush())
+    
+    def _record_event(self,
+                      event_type: AnalyticsEvent,
+                      wallet_address: Optional[str],
+                      provider_address: Optional[str],
+                      amount: Optional[float],
+                      metadata: Optional[Dict[str, Any]]):
+        """Queue an event and update real-time metrics"""
+        
         event = {
             "type": event_type.value,
             "timestamp": time.time(),
@@ -91,40 +153,37 @@ class AnalyticsBackend:
         
         # Update real-time metrics
         self._update_metrics(event)
-        
-        # Check if we should flush
-        if len(self.events_queue) >= self.batch_size:
-            await self.flush()
             
     def _update_metrics(self, event: Dict[str, Any]):
         """Update in-memory metrics"""
         
+        # Runs for every tracked event: bind hot lookups to locals and compare
+        # against plain strings rather than going through Enum.value
+        metrics = self.metrics
         event_type = event["type"]
         
-        if event_type == AnalyticsEvent.PAYMENT_COMPLETED.value:
-            self.metrics["total_payments"] += 1
-            self.metrics["total_revenue"] += event.get("amount", 0)
+        if event_type == _PAYMENT_COMPLETED:
+            metrics["total_payments"] += 1
+            metrics["total_revenue"] += event.get("amount", 0)
             
             if event.get("wallet_address"):
-                self.metrics["unique_wallets"].add(event["wallet_address"])
-                self.metrics["revenue_by_wallet"][event["wallet_address"]] += event.get("amount", 0)
+                metrics["revenue_by_wallet"][event["wallet_address"]] += event.get("amount", 0)
                 
             if event.get("provider_address"):
-                self.metrics["unique_providers"].add(event["provider_address"])
-                self.metrics["revenue_by_provider"][event["provider_address"]] += event.get("amount", 0)
+                metrics["revenue_by_provider"][event["provider_address"]] += event.get("amount", 0)
                 
             # Track hourly patterns
-            hour = datetime.fromtimestamp(event["timestamp"]).hour
-            self.metrics["payments_by_hour"][hour] += 1
+            hour = time.localtime(event["timestamp"]).tm_hour
+            metrics["payments_by_hour"][hour] += 1
             
-        elif event_type == AnalyticsEvent.PAYMENT_FAILED.value:
-            self.metrics["failed_payments"] += 1
+        elif event_type == _PAYMENT_FAILED:
+            metrics["failed_payments"] += 1
             
-        elif event_type == AnalyticsEvent.API_CALL.value:
+        elif event_type == _API_CALL:
             endpoint = event.get("metadata", {}).get("endpoint", "unknown")
-            self.metrics["api_calls_by_endpoint"][endpoint] += 1
+            metrics["api_calls_by_endpoint"][endpoint] += 1
             
-        elif event_type == AnalyticsEvent.FACILITATOR_VERIFICATION.value:
+        elif event_type == _FACILITATOR_VERIFICATION:
             self.premium_usage["facilitator_verifications"] += 1
             
     async def flush(self):
@@ -159,6 +218,102 @@ class AnalyticsBackend:
             await asyncio.sleep(self.flush_interval)
             await self.flush()
             
+    def save_snapshot(self):
+        """Atomically write current metrics to the snapshot file"""
+        self._write_snapshot(self._snapshot_state())
+        
+    def _snapshot_state(self) -> Dict[str, Any]:
+        """Copy metrics for a snapshot
+        
+        Must run on the event loop thread, which is the only writer of the
+        metrics, so the copy can't see them change mid-iteration.
+        """
+        return {
+            "metrics": {
+                key: dict(value) if isinstance(value, dict)
+                else list(value) if isinstance(value, list)
+                else value
+                for key, value in self.metrics.items()
+            },
+            "premium_usage": dict(self.premium_usage),
+        }
+        
+    def _write_snapshot(self, state: Dict[str, Any]):
+        """Write a snapshot copy to disk; safe to call from a worker thread"""
+        
+        tmp_path = f"{self._snapshot_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self._snapshot_path)
+        
+    def load_snapshot(self) -> bool:
+        """Restore metrics from the snapshot file, if one exists"""
+        
+        try:
+            with open(self._snapshot_path) as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            return False
+        except (OSError, ValueError) as e:
+            print(f"Failed to load analytics snapshot: {e}")
+            return False
+            
+        for key, value in state.get("metrics", {}).items():
+            if key not in self.metrics:
+                continue
+            current = self.metrics[key]
+            if isinstance(current, dict):
+                if isinstance(value, dict):
+                    current.update(value)
+            elif isinstance(current, list):
+                hours = self._hourly_counts(value)
+                if hours is not None:
+                    self.metrics[key] = hours
+            else:
+                self.metrics[key] = value
+                
+        self.premium_usage.update(state.get("premium_usage", {}))
+        return True
+        
+    @staticmethod
+    def _hourly_counts(value: Any) -> Optional[List[int]]:
+        """Validate a snapshot's payments_by_hour as 24 int counts
+        
+        Older snapshots stored a dict keyed by hour string; those are
+        converted. Anything else is dropped by returning None.
+        """
+        if isinstance(value, list):
+            if len(value) == 24 and all(isinstance(n, int) for n in value):
+                return list(value)
+            return None
+        
+        if isinstance(value, dict):
+            hours = [0] * 24
+            for hour, count in value.items():
+                try:
+                    hour = int(hour)
+                except (TypeError, ValueError):
+                    return None
+                if not 0 <= hour < 24 or not isinstance(count, int):
+                    return None
+                hours[hour] = count
+            return hours
+        
+        return None
+        
+    async def _periodic_snapshot(self):
+        """Periodically persist metrics"""
+        
+        while True:
+            await asyncio.sleep(self.snapshot_interval)
+            # Copy on the loop thread; only the file write goes to a thread
+            try:
+                state = self._snapshot_state()
+                await asyncio.to_thread(self._write_snapshot, state)
+            except Exception as e:
+                # Keep snapshotting; a failed write is retried next interval
+                print(f"Failed to save analytics snapshot: {e}")
+            
     def get_metrics(self) -> Dict[str, Any]:
         """Get current metrics"""
         
@@ -166,8 +321,8 @@ class AnalyticsBackend:
             "total_payments": self.metrics["total_payments"],
             "total_revenue": self.metrics["total_revenue"],
             "failed_payments": self.metrics["failed_payments"],
-            "unique_wallets": len(self.metrics["unique_wallets"]),
-            "unique_providers": len(self.metrics["unique_providers"]),
+            "unique_wallets": len(self.metrics["revenue_by_wallet"]),
+            "unique_providers": len(self.metrics["revenue_by_provider"]),
             "success_rate": (
                 self.metrics["total_payments"] / 
                 (self.metrics["total_payments"] + self.metrics["failed_payments"])
@@ -179,17 +334,21 @@ class AnalyticsBackend:
                 if self.metrics["total_payments"] > 0
                 else 0
             ),
-            "top_providers": sorted(
+            "top_providers": heapq.nlargest(
+                10,
                 self.metrics["revenue_by_provider"].items(),
-                key=lambda x: x[1],
-                reverse=True
-            )[:10],
-            "top_wallets": sorted(
-                self.metrics["revenue_by_wallet"].items(), 
-                key=lambda x: x[1],
-                reverse=True
-            )[:10],
-            "hourly_distribution": dict(self.metrics["payments_by_hour"]),
+                key=itemgetter(1),
+            ),
+            "top_wallets": heapq.nlargest(
+                10,
+                self.metrics["revenue_by_wallet"].items(),
+                key=itemgetter(1),
+            ),
+            "hourly_distribution": {
+                hour: count
+                for hour, count in enumerate(self.metrics["payments_by_hour"])
+                if count
+            },
             "premium_usage": dict(self.premium_usage),
         }
         
@@ -198,7 +357,7 @@ class AnalyticsBackend:
         
         return {
             "total_spent": self.metrics["revenue_by_wallet"].get(wallet_address, 0),
-            "is_active": wallet_address in self.metrics["unique_wallets"],
+            "is_active": wallet_address in self.metrics["revenue_by_wallet"],
         }
         
     def get_provider_metrics(self, provider_address: str) -> Dict[str, Any]:
@@ -206,7 +365,7 @@ class AnalyticsBackend:
         
         return {
             "total_revenue": self.metrics["revenue_by_provider"].get(provider_address, 0),
-            "is_active": provider_address in self.metrics["unique_providers"],
+            "is_active": provider_address in self.metrics["revenue_by_provider"],
         }
         
     async def check_premium_limit(self, 